@@ -1,163 +1,22 @@
-from flask import Flask, render_template_string, send_file, jsonify, request
-import requests
-from bs4 import BeautifulSoup
-import csv
+from flask import Flask, Response, render_template_string, jsonify, request, stream_with_context
 import json
-import time
-import io
 import os
-from urllib.parse import urljoin, urlparse
+import sqlite3
 from datetime import datetime
 
-app = Flask(__name__)
-
-
-class MassMailerScraper:
-    def __init__(self):
-        self.base_url = "https://massmailer.io"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
-
-    def get_page_content(self, url):
-        """Fetch page content with error handling"""
-        try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            return response.text
-        except requests.RequestException as e:
-            print(f"Error fetching {url}: {e}")
-            return None
-
-    def extract_blog_links(self, html_content, base_url):
-        """Extract blog post links from category page"""
-        soup = BeautifulSoup(html_content, 'html.parser')
-        blog_links = []
-
-        # Find all blog post links
-        for link in soup.find_all('a', href=True):
-            href = link.get('href')
-            if href and '/blog/' in href and href != '/blog/':
-                if href.startswith('/'):
-                    href = urljoin(base_url, href)
-                blog_links.append(href)
-
-        # Remove duplicates and filter valid blog URLs
-        unique_links = list(set(blog_links))
-        filtered_links = [link for link in unique_links if self.is_valid_blog_url(link)]
-
-        return filtered_links
-
-    def is_valid_blog_url(self, url):
-        """Check if URL is a valid blog post URL"""
-        parsed = urlparse(url)
-        return ('/blog/' in parsed.path and
-                parsed.path != '/blog/' and
-                not parsed.path.endswith('/blog'))
-
-    def scrape_blog_content(self, blog_url):
-        """Scrape individual blog post content"""
-        html_content = self.get_page_content(blog_url)
-        if not html_content:
-            return None
-
-        soup = BeautifulSoup(html_content, 'html.parser')
-
-        # Extract blog data - only include fields we want in CSV
-        blog_data = {
-            'title': '',
-            'url': blog_url,
-            'date': '',
-            'categories': '',
-            'meta_description': '',
-            'featured_image': '',
-            'content': ''
-        }
-
-        # Extract title
-        title_tag = soup.find('h1') or soup.find('title')
-        if title_tag:
-            blog_data['title'] = title_tag.get_text(strip=True)
-
-        # Extract content
-        content_div = soup.find('div', class_='post-content') or soup.find('article') or soup.find('div',
-                                                                                                   class_='content')
-        if content_div:
-            # Remove scripts and styles
-            for script in content_div(["script", "style"]):
-                script.decompose()
-            blog_data['content'] = content_div.get_text(strip=True)
-
-        # Extract meta description
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        if meta_desc:
-            blog_data['meta_description'] = meta_desc.get('content', '')
-
-        # Extract featured image
-        og_image = soup.find('meta', property='og:image')
-        if og_image:
-            blog_data['featured_image'] = og_image.get('content', '')
-        else:
-            # Try to find first image in content
-            first_img = soup.find('img')
-            if first_img:
-                img_src = first_img.get('src', '')
-                if img_src.startswith('/'):
-                    img_src = urljoin(blog_url, img_src)
-                blog_data['featured_image'] = img_src
-
-        # Extract date
-        date_selectors = [
-            'time[datetime]',
-            '.date',
-            '.post-date',
-            '.published'
-        ]
-
-        for selector in date_selectors:
-            date_elem = soup.select_one(selector)
-            if date_elem:
-                blog_data['date'] = date_elem.get('datetime') or date_elem.get_text(strip=True)
-                break
-
-        # Extract categories
-        categories = []
-        category_links = soup.find_all('a', href=lambda x: x and ('blog_categories' in x or 'category' in x))
-        for cat_link in category_links:
-            category = cat_link.get_text(strip=True)
-            if category:
-                categories.append(category)
-
-        blog_data['categories'] = ', '.join(categories)
-
-        return blog_data
-
-    def scrape_all_blogs(self, category_url):
-        """Main function to scrape all blogs from given URL"""
-        blogs_data = []
-
-        # Get category page content
-        html_content = self.get_page_content(category_url)
-        if not html_content:
-            return blogs_data
-
-        # Extract base URL for the given site
-        parsed_url = urlparse(category_url)
-        base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
-
-        # Extract blog links
-        blog_links = self.extract_blog_links(html_content, base_url)
-
-        # Scrape each blog
-        for blog_url in blog_links:
-            blog_data = self.scrape_blog_content(blog_url)
-            if blog_data:
-                blogs_data.append(blog_data)
-            time.sleep(1)  # Be respectful
-
-        return blogs_data
+from checkpoint import Checkpoint, CheckpointError, checkpoint_path
+from connpool import get_session_pool
+from dedupe import EXACT, DuplicateDetector, url_key
+from engine import build_scraper, get_post_archive, http_cache, parse_options
+from exporters import EXPORT_FORMATS, ExportError, iter_export
+from incremental import summarize_changes
+from jobs import DONE, FAILED, JobRunner, create_job_store
+from metrics import EXPORT_BYTES, REGISTRY, timed_iter
+from profiles import PROFILES
+from results import ResultStore
+from workqueue import WorkQueue
 
+app = Flask(__name__)
 
 # HTML Template
 HTML_TEMPLATE = """
@@ -385,6 +244,7 @@ HTML_TEMPLATE = """
 
     <script>
         let scrapedData = [];
+        let resultId = null;
 
         function showStatus(message, type) {
             const statusDiv = document.getElementById('status');
@@ -436,7 +296,7 @@ HTML_TEMPLATE = """
             updateProgress(10);
 
             try {
-                const response = await fetch('/scrape', {
+                const response = await fetch('/jobs', {
                     method: 'POST',
                     headers: {
                         'Content-Type': 'application/json',
@@ -444,17 +304,17 @@ HTML_TEMPLATE = """
                     body: JSON.stringify({ url: url })
                 });
 
-                updateProgress(50);
-
                 if (!response.ok) {
                     throw new Error('Scraping failed');
                 }
 
-                const data = await response.json();
+                const job = await response.json();
+                const data = await waitForJob(job);
                 updateProgress(100);
 
                 if (data.success) {
                     scrapedData = data.blogs;
+                    resultId = data.result_id;
                     showStatus(`✅ Successfully scraped ${data.blogs.length} blog posts from ${url}!`, 'success');
                     displayResults(data.blogs);
                     downloadBtn.style.display = 'inline-block';
@@ -471,6 +331,20 @@ HTML_TEMPLATE = """
             setTimeout(() => showProgress(false), 1000);
         }
 
+        async function waitForJob(job) {
+            while (true) {
+                await new Promise(resolve => setTimeout(resolve, 1000));
+                const status = await (await fetch(job.status_url)).json();
+                if (status.progress_total) {
+                    updateProgress(10 + 85 * status.progress_done / status.progress_total);
+                    showStatus(`🔄 Scraped ${status.progress_done} of ${status.progress_total} links...`, 'info');
+                }
+                if (status.status === 'done' || status.status === 'failed') {
+                    return await (await fetch(job.result_url)).json();
+                }
+            }
+        }
+
         function displayResults(blogs) {
             const resultsDiv = document.getElementById('results');
             const statsDiv = document.getElementById('stats');
@@ -515,7 +389,7 @@ HTML_TEMPLATE = """
 
         async function downloadCSV() {
             try {
-                const response = await fetch('/download-csv');
+                const response = await fetch(`/download-csv?result_id=${encodeURIComponent(resultId)}`);
                 const blob = await response.blob();
 
                 const url = window.URL.createObjectURL(blob);
@@ -544,8 +418,142 @@ HTML_TEMPLATE = """
 </html>
 """
 
-# Global variable to store scraped data
-scraped_blogs = []
+
+# Use JOB_STORE=sqlite:///path/jobs.db to share jobs between workers
+JOB_STORE = os.environ.get('JOB_STORE', 'memory')
+
+# Scrape results keyed by result id (the job id for background jobs). They are also written to
+# RESULT_STORE_PATH, or with a SQLite JOB_STORE to the jobs file, for every worker process to read
+result_store = ResultStore(
+    max_bytes=int(os.environ.get('RESULT_STORE_MAX_BYTES', 256 * 1024 * 1024)),
+    ttl=int(os.environ.get('RESULT_TTL', 3600)),
+    spill_dir=os.environ.get('RESULT_SPILL_DIR'),
+    spill_threshold=int(os.environ.get('RESULT_SPILL_THRESHOLD', 32 * 1024 * 1024)),
+    shared_path=os.environ.get('RESULT_STORE_PATH') or (
+        JOB_STORE[len('sqlite:///'):] if JOB_STORE.startswith('sqlite:///') else None)
+)
+
+
+# Scrape journals for resuming interrupted scrapes; enabled by setting CHECKPOINT_DIR
+CHECKPOINT_DIR = os.environ.get('CHECKPOINT_DIR')
+if CHECKPOINT_DIR:
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+
+
+def open_checkpoint(name):
+    """The Checkpoint called name, or None when checkpoints are disabled; raises ValueError for bad names"""
+    if not CHECKPOINT_DIR or not name:
+        return None
+    return Checkpoint(checkpoint_path(CHECKPOINT_DIR, name))
+
+
+def scrape_summary(scraper, blogs, category_url, options):
+    """Response fields describing a finished scrape"""
+    summary = {
+        'success': True,
+        'count': len(blogs),
+        'source_url': category_url,
+        'fetch_stats': scraper.fetch_stats.to_dict(),
+        'hosts': scraper.rate_limiter.stats(),
+        'duplicates': scraper.duplicates.stats(),
+        'retries': scraper.retries.stats(),
+        'timings': scraper.timings.to_dict()
+    }
+    if scraper.checkpoint:
+        summary['checkpoint'] = scraper.checkpoint.stats()
+    if options.get('incremental'):
+        summary['changes'] = summarize_changes(blogs)
+    return summary
+
+
+# Most listing URLs accepted by one batch scrape
+MAX_BATCH_URLS = int(os.environ.get('MAX_BATCH_URLS', 500))
+
+# Largest values web clients may ask for; larger ones are lowered. The CLI and workers are not capped
+CLIENT_CAPS = {
+    'concurrency': int(os.environ.get('MAX_CONCURRENCY', 16)),
+    'max_pages': int(os.environ.get('MAX_PAGES', 100)),
+    'max_posts': int(os.environ.get('MAX_POSTS', 10000)),
+    # Pacing toward third-party hosts
+    'requests_per_second': float(os.environ.get('MAX_REQUESTS_PER_SECOND', 10)),
+    'max_requests_per_second': float(os.environ.get('MAX_REQUESTS_PER_SECOND', 10)),
+}
+
+
+def batch_urls(options):
+    """The deduplicated 'urls' list of a batch request, or raise ValueError"""
+    urls = options.get('urls')
+    if not isinstance(urls, list) or not urls or not all(isinstance(url, str) and url for url in urls):
+        raise ValueError('urls must be a non-empty list of URLs')
+    urls = list(dict.fromkeys(urls))
+    if len(urls) > MAX_BATCH_URLS:
+        raise ValueError(f'At most {MAX_BATCH_URLS} URLs per batch')
+    if options.get('incremental'):
+        raise ValueError('incremental is not supported for batch scrapes')
+    return urls
+
+
+def scrape_batch_summary(scraper, blogs, sources):
+    """Response fields describing a finished batch scrape"""
+    summary = {
+        'success': True,
+        'count': len(blogs),
+        'sources': sources,
+        'shared_posts': sum(1 for blog in blogs if len(blog['sources']) > 1),
+        'fetch_stats': scraper.fetch_stats.to_dict(),
+        'hosts': scraper.rate_limiter.stats(),
+        'duplicates': scraper.duplicates.stats(),
+        'retries': scraper.retries.stats(),
+        'timings': scraper.timings.to_dict()
+    }
+    if scraper.checkpoint:
+        summary['checkpoint'] = scraper.checkpoint.stats()
+    return summary
+
+
+def run_scrape_job(job_id, category_url, options, on_progress):
+    # Jobs are checkpointed under their id, so POST /jobs/<id>/resume picks up where they stopped
+    scraper = build_scraper(options, open_checkpoint(job_id))
+    if options.get('urls'):
+        blogs, sources = scraper.scrape_batch(batch_urls(options), on_progress)
+        summary = scrape_batch_summary(scraper, blogs, sources)
+    else:
+        blogs = scraper.scrape_all_blogs(category_url, on_progress)
+        summary = scrape_summary(scraper, blogs, category_url, options)
+    result_store.put(blogs, result_id=job_id)
+    if scraper.checkpoint:
+        scraper.checkpoint.discard()
+    # The rows live in the result store; the job only keeps a summary
+    return {**summary, 'result_id': job_id}
+
+
+# Shared frontier for distributed crawls run by worker.py processes; enabled by setting WORK_QUEUE_PATH
+work_queue = None
+if os.environ.get('WORK_QUEUE_PATH'):
+    work_queue = WorkQueue(
+        os.environ['WORK_QUEUE_PATH'],
+        max_attempts=int(os.environ.get('WORK_QUEUE_MAX_ATTEMPTS', 3))
+    )
+
+
+def crawl_rows(crawl):
+    """A finished distributed crawl's rows, dropping posts that repeat an earlier one
+
+    Workers see only their own posts, so duplicates across workers are dropped here.
+    """
+    params = crawl['params']
+    duplicates = DuplicateDetector(params.get('dedupe', EXACT), int(params.get('near_distance', 3)))
+    blogs = [blog for blog in work_queue.iter_rows(crawl['id'])
+             if not duplicates.check(blog['url'], blog['content'], url_key(blog['url']))]
+    return blogs, duplicates
+
+
+# Background scrape jobs, kept in JOB_STORE
+job_runner = JobRunner(
+    create_job_store(JOB_STORE),
+    run_scrape_job,
+    max_workers=int(os.environ.get('JOB_WORKERS', 2))
+)
 
 
 @app.route('/')
@@ -555,7 +563,6 @@ def index():
 
 @app.route('/scrape', methods=['POST'])
 def scrape_blogs():
-    global scraped_blogs
     try:
         data = request.get_json()
         category_url = data.get('url')
@@ -565,16 +572,69 @@ def scrape_blogs():
                 'success': False,
                 'error': 'URL is required'
             })
+        try:
+            data = parse_options(data, CLIENT_CAPS)
+            # A named checkpoint resumes an earlier run of the same scrape that was cut short
+            checkpoint = open_checkpoint(data.get('checkpoint'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+
+        scraper = build_scraper(data, checkpoint)
+        blogs = scraper.scrape_all_blogs(category_url)
+        result_id = result_store.put(blogs)
+        if scraper.checkpoint:
+            scraper.checkpoint.discard()
+
+        return jsonify({
+            **scrape_summary(scraper, blogs, category_url, data),
+            'result_id': result_id,
+            'blogs': blogs
+        })
+    except CheckpointError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 409
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+
+@app.route('/scrape/batch', methods=['POST'])
+def scrape_batch():
+    """Scrape a list of listing URLs as one crawl sharing fetches, connections and rate limits"""
+    try:
+        data = parse_options(request.get_json() or {}, CLIENT_CAPS)
+        urls = batch_urls(data)
+        checkpoint = open_checkpoint(data.get('checkpoint'))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
 
-        scraper = MassMailerScraper()
-        scraped_blogs = scraper.scrape_all_blogs(category_url)
+    try:
+        scraper = build_scraper(data, checkpoint)
+        blogs, sources = scraper.scrape_batch(urls)
+        result_id = result_store.put(blogs)
+        if scraper.checkpoint:
+            scraper.checkpoint.discard()
 
         return jsonify({
-            'success': True,
-            'blogs': scraped_blogs,
-            'count': len(scraped_blogs),
-            'source_url': category_url
+            **scrape_batch_summary(scraper, blogs, sources),
+            'result_id': result_id,
+            'blogs': blogs
         })
+    except CheckpointError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 409
     except Exception as e:
         return jsonify({
             'success': False,
@@ -582,45 +642,326 @@ def scrape_blogs():
         })
 
 
+def stream_events(scraper, category_url):
+    """Yield (event, payload) pairs for a streamed scrape"""
+    count = 0
+    try:
+        for done, total, blog_data in scraper.iter_blogs(category_url):
+            if done == 0:
+                yield 'start', {'source_url': category_url, 'total': total}
+            elif blog_data:
+                count += 1
+                yield 'blog', {'done': done, 'total': total, 'blog': blog_data}
+            else:
+                yield 'progress', {'done': done, 'total': total}
+        yield 'end', {'success': True, 'count': count, 'source_url': category_url,
+                      'fetch_stats': scraper.fetch_stats.to_dict(), 'duplicates': scraper.duplicates.stats(),
+                      'hosts': scraper.rate_limiter.stats(), 'retries': scraper.retries.stats(),
+                      'timings': scraper.timings.to_dict()}
+    except Exception as e:
+        yield 'error', {'success': False, 'error': str(e)}
+
+
+def format_ndjson(event, payload):
+    return json.dumps({'event': event, **payload}) + '\n'
+
+
+def format_sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+@app.route('/scrape/stream', methods=['GET', 'POST'])
+def scrape_stream():
+    """Stream each post as soon as it is scraped, as NDJSON (default) or Server-Sent Events
+
+    Streamed results are not kept on the server; use /jobs for a downloadable result.
+    """
+    data = (request.get_json(silent=True) if request.method == 'POST' else request.args.to_dict()) or {}
+    category_url = data.get('url')
+
+    if not category_url:
+        return jsonify({
+            'success': False,
+            'error': 'URL is required'
+        }), 400
+    try:
+        data = parse_options(data, CLIENT_CAPS)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    use_sse = data.get('format') == 'sse' or 'text/event-stream' in request.headers.get('Accept', '')
+    formatter = format_sse if use_sse else format_ndjson
+    scraper = build_scraper(data)
+
+    def generate():
+        for event, payload in stream_events(scraper, category_url):
+            yield formatter(event, payload)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream' if use_sse else 'application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    try:
+        data = parse_options(request.get_json() or {}, CLIENT_CAPS)
+        # A batch job's url is recorded as its first listing for display
+        category_url = batch_urls(data)[0] if data.get('urls') else data.get('url')
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    if not category_url:
+        return jsonify({
+            'success': False,
+            'error': 'URL is required'
+        }), 400
+
+    job_id = job_runner.submit(category_url, data)
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': f'/jobs/{job_id}',
+        'result_url': f'/jobs/{job_id}/result'
+    }), 202
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_runner.store.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, **job})
+
+
+@app.route('/jobs/<job_id>/resume', methods=['POST'])
+def resume_job(job_id):
+    """Run an interrupted job again from its checkpoint, e.g. after its worker was recycled"""
+    if not CHECKPOINT_DIR:
+        return jsonify({'success': False, 'error': 'Checkpoints are disabled; set CHECKPOINT_DIR'}), 400
+    job = job_runner.store.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    if job['status'] == DONE:
+        return jsonify({'success': False, 'error': 'Job already finished'}), 409
+    if job_runner.is_active(job_id) or open_checkpoint(job_id).busy():
+        return jsonify({'success': False, 'error': 'Job is still running'}), 409
+
+    job_runner.resume(job_id)
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': f'/jobs/{job_id}',
+        'result_url': f'/jobs/{job_id}/result'
+    }), 202
+
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    job = job_runner.store.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    if job['status'] == FAILED:
+        return jsonify({'success': False, 'error': job['error']}), 500
+    if job['status'] != DONE:
+        return jsonify({'success': False, 'error': 'Job not finished', 'status': job['status']}), 409
+
+    result = job_runner.store.get_result(job_id)
+    blogs = result_store.get(result['result_id'])
+    if blogs is None:
+        return jsonify({'success': False, 'error': 'Result expired'}), 410
+    return jsonify({**result, 'blogs': blogs})
+
+
+@app.route('/crawls', methods=['POST'])
+def create_crawl():
+    """Queue a crawl of 'url' or 'urls' for worker.py processes to scrape"""
+    if not work_queue:
+        return jsonify({'success': False, 'error': 'Distributed crawls are not enabled; set WORK_QUEUE_PATH'}), 404
+    try:
+        data = parse_options(request.get_json() or {}, CLIENT_CAPS)
+        urls = batch_urls(data) if data.get('urls') else [data.get('url')]
+        if not urls[0]:
+            raise ValueError('URL is required')
+        if data.get('incremental'):
+            raise ValueError('incremental is not supported for distributed crawls')
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    crawl_id = work_queue.create_crawl(urls, data)
+    return jsonify({
+        'success': True,
+        'crawl_id': crawl_id,
+        'status_url': f'/crawls/{crawl_id}',
+        'result_url': f'/crawls/{crawl_id}/result'
+    }), 202
+
+
+@app.route('/crawls/<crawl_id>')
+def crawl_status(crawl_id):
+    if not work_queue:
+        return jsonify({'success': False, 'error': 'Distributed crawls are not enabled; set WORK_QUEUE_PATH'}), 404
+    crawl = work_queue.crawl(crawl_id)
+    if not crawl:
+        return jsonify({'success': False, 'error': 'Crawl not found'}), 404
+    return jsonify({'success': True, **crawl, **work_queue.progress(crawl_id),
+                    'failed': work_queue.failures(crawl_id)})
+
+
+@app.route('/crawls/<crawl_id>/result')
+def crawl_result(crawl_id):
+    """The rows of a finished crawl; they are also stored for /download/<fmt>?result_id=<crawl_id>"""
+    if not work_queue:
+        return jsonify({'success': False, 'error': 'Distributed crawls are not enabled; set WORK_QUEUE_PATH'}), 404
+    crawl = work_queue.crawl(crawl_id)
+    if not crawl:
+        return jsonify({'success': False, 'error': 'Crawl not found'}), 404
+    progress = work_queue.progress(crawl_id)
+    if not progress['finished']:
+        return jsonify({'success': False, 'error': 'Crawl not finished', **progress}), 409
+
+    blogs, duplicates = crawl_rows(crawl)
+    result_store.put(blogs, result_id=crawl_id)
+    return jsonify({
+        'success': True,
+        'count': len(blogs),
+        'duplicates': duplicates.stats(),
+        'failed': work_queue.failures(crawl_id),
+        'result_id': crawl_id,
+        'blogs': blogs
+    })
+
+
+@app.route('/posts')
+def search_posts():
+    """Query archived posts: full-text q, category, source, date_from/date_to, limit and offset"""
+    post_archive = get_post_archive()
+    if not post_archive:
+        return jsonify({'success': False, 'error': 'Post archive is not enabled; set POST_ARCHIVE_PATH'}), 404
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'limit and offset must be integers'}), 400
+
+    try:
+        total, posts = post_archive.search(
+            query=request.args.get('q'),
+            category=request.args.get('category'),
+            source_url=request.args.get('source'),
+            date_from=request.args.get('date_from'),
+            date_to=request.args.get('date_to'),
+            limit=limit,
+            offset=offset,
+            include_content=request.args.get('include_content') in ('1', 'true')
+        )
+    except sqlite3.OperationalError as e:
+        return jsonify({'success': False, 'error': f'Invalid search: {e}'}), 400
+    return jsonify({
+        'success': True,
+        'total': total,
+        'limit': limit,
+        'offset': offset,
+        'next_offset': offset + limit if offset + limit < total else None,
+        'posts': posts
+    })
+
+
+@app.route('/posts/categories')
+def post_categories():
+    post_archive = get_post_archive()
+    if not post_archive:
+        return jsonify({'success': False, 'error': 'Post archive is not enabled; set POST_ARCHIVE_PATH'}), 404
+    return jsonify({
+        'success': True,
+        'categories': [{'category': category, 'posts': count} for category, count in post_archive.categories()]
+    })
+
+
 @app.route('/download-csv')
 def download_csv():
-    global scraped_blogs
+    return download_results('csv')
 
-    if not scraped_blogs:
+
+@app.route('/download/<fmt>')
+def download_results(fmt):
+    """Stream a stored result as CSV, NDJSON or Parquet without building the file in memory"""
+    if fmt not in EXPORT_FORMATS:
+        return f"Unknown format: {fmt}", 400
+
+    result_id = request.args.get('result_id')
+    if not result_id or not result_store.count(result_id):
         return "No data available. Please scrape first.", 400
 
-    # Create CSV in memory
-    output = io.StringIO()
-    fieldnames = ['title', 'url', 'date', 'categories', 'meta_description', 'featured_image', 'content']
-    writer = csv.DictWriter(output, fieldnames=fieldnames)
+    try:
+        chunks = timed_iter(iter_export(result_store.iter_rows(result_id), fmt), 'export',
+                            EXPORT_BYTES, format=fmt)
+    except ExportError as e:
+        return str(e), 501
+
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    filename = f"scraped_blogs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
 
-    writer.writeheader()
-    for blog in scraped_blogs:
-        writer.writerow(blog)
+def status_gauges():
+    """Gauges read from the cache, connection pool and result store at scrape time"""
+    gauges = []
+    if http_cache:
+        cache = http_cache.stats()
+        gauges.append(('scraper_http_cache_hit_ratio', 'Share of cached lookups served without a full download',
+                       (), {(): cache['hit_rate']}))
+        gauges.append(('scraper_http_cache_evictions', 'Entries evicted from the HTTP cache',
+                       (), {(): cache['evictions']}))
+    connections = get_session_pool().stats()
+    gauges.append(('scraper_connection_reuse_ratio', 'Share of requests sent on a kept-alive connection',
+                   (), {(): connections['reuse_rate']}))
+    results = result_store.stats()
+    gauges.append(('scraper_result_store_bytes', 'Bytes of scrape results held in memory',
+                   (), {(): results['memory_bytes']}))
+    return gauges
 
-    # Create response
-    mem = io.BytesIO()
-    mem.write(output.getvalue().encode('utf-8'))
-    mem.seek(0)
 
-    filename = f"scraped_blogs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+REGISTRY.register_gauges(status_gauges)
 
-    return send_file(
-        mem,
-        as_attachment=True,
-        download_name=filename,
-        mimetype='text/csv'
-    )
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text exposition of stage latencies, byte and error counters and cache ratios"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
 
 
 @app.route('/api/status')
 def api_status():
-    global scraped_blogs
-    return jsonify({
+    post_archive = get_post_archive()
+    status = {
         'status': 'running',
-        'scraped_count': len(scraped_blogs),
+        'results': result_store.stats(),
+        'http_cache': http_cache.stats() if http_cache else None,
+        'archive': post_archive.stats() if post_archive else None,
+        'connections': get_session_pool().stats(),
+        # Profiles learned in this process; parse pool workers keep their own
+        'extraction_profiles': PROFILES.stats(),
         'timestamp': datetime.now().isoformat()
-    })
+    }
+    result_id = request.args.get('result_id')
+    if result_id:
+        status['result_id'] = result_id
+        status['scraped_count'] = result_store.count(result_id) or 0
+    return jsonify(status)
 
 
 if __name__ == '__main__':
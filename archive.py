@@ -0,0 +1,249 @@
+import atexit
+import queue
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+from parsing import BLOG_FIELDS
+
+ISO_DATE_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})')
+DATE_FORMATS = ('%B %d, %Y', '%b %d, %Y', '%d %B %Y', '%d %b %Y', '%B %d %Y', '%m/%d/%Y')
+
+
+def normalize_date(text):
+    """YYYY-MM-DD for the date formats posts and feeds commonly use, else None"""
+    text = (text or '').strip()
+    if not text:
+        return None
+    match = ISO_DATE_RE.search(text)
+    if match:
+        return '-'.join(match.groups())
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date().isoformat()
+        except ValueError:
+            pass
+    try:
+        return parsedate_to_datetime(text).date().isoformat()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def fts_query(text):
+    """Quote each term of free-text input so it cannot break FTS5 query syntax"""
+    terms = [term.replace('"', '""') for term in text.split()]
+    return ' '.join(f'"{term}"' for term in terms if term)
+
+
+class PostArchive:
+    """SQLite archive of scraped posts with FTS5 search over title and content
+
+    add() only queues a post; a background writer thread stores queued posts
+    in batches of up to batch_size rows per transaction, at most
+    flush_interval seconds after they arrive, so scrapes never wait on disk.
+    Posts still queued when the process exits are written by an atexit hook.
+    """
+
+    def __init__(self, path, batch_size=200, flush_interval=1.0, max_queue=10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.written = 0
+        self.errors = 0
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS posts (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL UNIQUE,
+                title TEXT,
+                date TEXT,
+                published TEXT,
+                categories TEXT,
+                meta_description TEXT,
+                featured_image TEXT,
+                content TEXT,
+                source_url TEXT,
+                first_scraped REAL,
+                updated_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS posts_published ON posts (published);
+            CREATE INDEX IF NOT EXISTS posts_source ON posts (source_url);
+            CREATE TABLE IF NOT EXISTS post_categories (
+                post_id INTEGER NOT NULL,
+                category TEXT NOT NULL COLLATE NOCASE,
+                PRIMARY KEY (category, post_id)
+            );
+            CREATE INDEX IF NOT EXISTS post_categories_post ON post_categories (post_id);
+            CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+                title, content, content='posts', content_rowid='id', tokenize='porter unicode61'
+            );
+            CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+                INSERT INTO posts_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+                INSERT INTO posts_fts (posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+            END;
+            CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF title, content ON posts BEGIN
+                INSERT INTO posts_fts (posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+                INSERT INTO posts_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+            END;
+        """)
+        conn.commit()
+        self.queue = queue.Queue(max_queue)
+        self.closed = False
+        self.writer = threading.Thread(target=self._write_loop, name='post-archive-writer', daemon=True)
+        self.writer.start()
+        # The writer is a daemon thread so it never holds the process open; drain it on the way out instead
+        atexit.register(self.close)
+
+    def _conn(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            self.local.conn = conn
+        return conn
+
+    def add(self, blog_data, source_url=None):
+        """Queue a scraped post for writing; blocks only if the writer is max_queue posts behind"""
+        self.queue.put(({field: blog_data.get(field, '') for field in BLOG_FIELDS}, source_url, time.time()))
+
+    def flush(self):
+        """Wait until every queued post has been written"""
+        self.queue.join()
+
+    def close(self, timeout=30):
+        """Write the posts still queued and stop the writer thread; later add() calls are not written"""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+        self.queue.put(None)
+        self.writer.join(timeout)
+
+    def _write_loop(self):
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    # close() queued this after every post it has to write
+                    self.queue.task_done()
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self._write(batch)
+            except sqlite3.Error as e:
+                with self.lock:
+                    self.errors += len(batch)
+                print(f"Error writing {len(batch)} posts to the archive: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _write(self, batch):
+        conn = self._conn()
+        with conn:
+            for post, source_url, scraped_at in batch:
+                row = conn.execute(
+                    'INSERT INTO posts (url, title, date, published, categories, meta_description, featured_image, '
+                    'content, source_url, first_scraped, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (url) DO UPDATE SET title = excluded.title, date = excluded.date, '
+                    'published = excluded.published, categories = excluded.categories, '
+                    'meta_description = excluded.meta_description, featured_image = excluded.featured_image, '
+                    'content = excluded.content, source_url = excluded.source_url, updated_at = excluded.updated_at '
+                    # Unchanged re-scrapes leave the row and its FTS entry alone
+                    'WHERE (posts.title, posts.date, posts.categories, posts.meta_description, posts.featured_image, '
+                    'posts.content) IS NOT (excluded.title, excluded.date, excluded.categories, '
+                    'excluded.meta_description, excluded.featured_image, excluded.content) '
+                    'RETURNING id',
+                    (post['url'], post['title'], post['date'], normalize_date(post['date']), post['categories'],
+                     post['meta_description'], post['featured_image'], post['content'], source_url,
+                     scraped_at, scraped_at)
+                ).fetchone()
+                if row is None:
+                    continue
+                conn.execute('DELETE FROM post_categories WHERE post_id = ?', (row[0],))
+                categories = {category.strip() for category in (post['categories'] or '').split(',')}
+                conn.executemany('INSERT OR IGNORE INTO post_categories (post_id, category) VALUES (?, ?)',
+                                 [(row[0], category) for category in categories if category])
+        with self.lock:
+            self.written += len(batch)
+
+    def search(self, query=None, category=None, source_url=None, date_from=None, date_to=None,
+               limit=50, offset=0, include_content=False):
+        """Return (total, posts) matching every given filter, best matches first when searching
+
+        A query with no terms, e.g. only whitespace, is not a filter.
+        """
+        query = fts_query(query or '')
+        joins = ''
+        where = []
+        params = []
+        if query:
+            joins = ' JOIN posts_fts ON posts_fts.rowid = p.id'
+            where.append('posts_fts MATCH ?')
+            params.append(query)
+        if category:
+            where.append('p.id IN (SELECT post_id FROM post_categories WHERE category = ?)')
+            params.append(category)
+        if source_url:
+            where.append('p.source_url = ?')
+            params.append(source_url)
+        if date_from:
+            where.append('p.published >= ?')
+            params.append(normalize_date(date_from) or date_from)
+        if date_to:
+            where.append('p.published <= ?')
+            params.append(normalize_date(date_to) or date_to)
+        clause = f"FROM posts p{joins}{' WHERE ' + ' AND '.join(where) if where else ''}"
+
+        columns = ['p.url', 'p.title', 'p.date', 'p.published', 'p.categories', 'p.meta_description',
+                   'p.featured_image', 'p.source_url', 'p.updated_at']
+        if include_content:
+            columns.append('p.content')
+        if query:
+            columns.append("snippet(posts_fts, 1, '[', ']', '...', 16) AS snippet")
+        order = 'bm25(posts_fts)' if query else 'p.updated_at DESC'
+
+        conn = self._conn()
+        total = conn.execute(f'SELECT COUNT(*) {clause}', params).fetchone()[0]
+        rows = conn.execute(f"SELECT {', '.join(columns)} {clause} ORDER BY {order}, p.id LIMIT ? OFFSET ?",
+                            [*params, limit, offset]).fetchall()
+        return total, [dict(row) for row in rows]
+
+    def categories(self):
+        """[(category, post count)] most common first"""
+        rows = self._conn().execute(
+            'SELECT category, COUNT(*) FROM post_categories GROUP BY category ORDER BY COUNT(*) DESC, category'
+        ).fetchall()
+        return [(category, count) for category, count in rows]
+
+    def stats(self):
+        posts = self._conn().execute('SELECT COUNT(*) FROM posts').fetchone()[0]
+        with self.lock:
+            return {
+                'posts': posts,
+                'queued': self.queue.qsize(),
+                'written': self.written,
+                'errors': self.errors
+            }
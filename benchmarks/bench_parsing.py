@@ -0,0 +1,122 @@
+"""Per-page CPU time of blog post extraction: legacy, single-pass soup and compiled host profiles
+
+Usage: python benchmarks/bench_parsing.py [--paragraphs N] [--repeat N]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from urllib.parse import urljoin
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from fixture_server import synthetic_listing, synthetic_post  # noqa: E402
+from parsing import anchor_soup, extract_blog_data, extract_with_soup  # noqa: E402
+
+
+def legacy_extract(html_content, blog_url, parser='html.parser'):
+    """The original multi-pass scrape_blog_content extraction"""
+    soup = BeautifulSoup(html_content, parser)
+    blog_data = {
+        'title': '',
+        'url': blog_url,
+        'date': '',
+        'categories': '',
+        'meta_description': '',
+        'featured_image': '',
+        'content': ''
+    }
+    title_tag = soup.find('h1') or soup.find('title')
+    if title_tag:
+        blog_data['title'] = title_tag.get_text(strip=True)
+    content_div = soup.find('div', class_='post-content') or soup.find('article') or soup.find('div',
+                                                                                               class_='content')
+    if content_div:
+        for script in content_div(["script", "style"]):
+            script.decompose()
+        blog_data['content'] = content_div.get_text(strip=True)
+    meta_desc = soup.find('meta', attrs={'name': 'description'})
+    if meta_desc:
+        blog_data['meta_description'] = meta_desc.get('content', '')
+    og_image = soup.find('meta', property='og:image')
+    if og_image:
+        blog_data['featured_image'] = og_image.get('content', '')
+    else:
+        first_img = soup.find('img')
+        if first_img:
+            img_src = first_img.get('src', '')
+            if img_src.startswith('/'):
+                img_src = urljoin(blog_url, img_src)
+            blog_data['featured_image'] = img_src
+    for selector in ['time[datetime]', '.date', '.post-date', '.published']:
+        date_elem = soup.select_one(selector)
+        if date_elem:
+            blog_data['date'] = date_elem.get('datetime') or date_elem.get_text(strip=True)
+            break
+    categories = []
+    for cat_link in soup.find_all('a', href=lambda x: x and ('blog_categories' in x or 'category' in x)):
+        category = cat_link.get_text(strip=True)
+        if category:
+            categories.append(category)
+    blog_data['categories'] = ', '.join(categories)
+    return blog_data
+
+
+def same_as_legacy(legacy, blog_data):
+    """True if only the spacing of content differs; the legacy extractor ran paragraphs together"""
+    fields = [field for field in legacy if field != 'content']
+    return ([legacy[field] for field in fields] == [blog_data[field] for field in fields] and
+            ''.join(legacy['content'].split()) == ''.join(blog_data['content'].split()))
+
+
+def cpu_time_per_page(func, html_content, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        func(html_content, 'https://massmailer.io/blog/benchmark/')
+    return (time.process_time() - start) / repeat
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--paragraphs', type=int, default=200)
+    arg_parser.add_argument('--repeat', type=int, default=20)
+    args = arg_parser.parse_args()
+
+    html_content = synthetic_post(args.paragraphs)
+    url = 'https://massmailer.io/blog/benchmark/'
+    if not same_as_legacy(legacy_extract(html_content, url), extract_blog_data(html_content, url, 'html.parser')):
+        sys.exit('single-pass extractor output differs from the legacy extractor')
+    if not same_as_legacy(legacy_extract(html_content, url, 'lxml'), extract_blog_data(html_content, url, 'lxml')):
+        sys.exit('profile extractor output differs from the legacy extractor')
+
+    cases = {
+        'legacy_html.parser': lambda html, u: legacy_extract(html, u, 'html.parser'),
+        'legacy_lxml': lambda html, u: legacy_extract(html, u, 'lxml'),
+        'single_pass_html.parser': lambda html, u: extract_blog_data(html, u, 'html.parser'),
+        'single_pass_lxml': lambda html, u: extract_with_soup(html, u, 'lxml'),
+        # Past the first pages of the host, so only its learned selectors run
+        'host_profile_lxml': lambda html, u: extract_blog_data(html, u, 'lxml'),
+    }
+    results = {name: cpu_time_per_page(func, html_content, args.repeat) for name, func in cases.items()}
+
+    listing = synthetic_listing(args.paragraphs)
+    listing_cases = {
+        'listing_legacy_html.parser': lambda html, u: BeautifulSoup(html, 'html.parser').find_all('a', href=True),
+        'listing_anchor_only_lxml': lambda html, u: anchor_soup(html, 'lxml').find_all('a', href=True),
+    }
+    results.update({name: cpu_time_per_page(func, listing, args.repeat) for name, func in listing_cases.items()})
+    baselines = {name: results['listing_legacy_html.parser' if name.startswith('listing') else 'legacy_html.parser']
+                 for name in results}
+    print(json.dumps({
+        'page_bytes': len(html_content),
+        'repeat': args.repeat,
+        'cpu_ms_per_page': {name: round(seconds * 1000, 3) for name, seconds in results.items()},
+        'speedup_vs_legacy': {name: round(baselines[name] / seconds, 2) for name, seconds in results.items()}
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""Scraper throughput: extraction microbenchmarks plus end-to-end pages/sec and peak RSS
+
+Pages come from a local fixture server (benchmarks/fixture_server.py) with
+configurable latency and page size. Each end-to-end case runs in its own
+interpreter so its peak RSS is not inflated by the cases before it.
+
+Usage: python benchmarks/bench_scraper.py [--posts N] [--pages N] [--paragraphs N] [--latency S]
+                                          [--concurrency N] [--rows N] [--repeat N]
+                                          [--output FILE] [--baseline FILE]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixture_server import FixtureServer, synthetic_listing, synthetic_post  # noqa: E402
+
+CASES = ('micro', 'scrape_all_blogs', 'download_csv', 'result_memory')
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process; ru_maxrss is KB on Linux and bytes on macOS"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def build_scraper(args):
+    from engine import MassMailerScraper
+    return MassMailerScraper(concurrency=args.concurrency, requests_per_second=100000,
+                             max_in_flight_per_host=args.concurrency, max_pages=args.pages)
+
+
+def run_micro(args):
+    """Per-call cost of extract_blog_links on a listing and scrape_blog_content against a zero-latency server"""
+    scraper = build_scraper(args)
+    listing = synthetic_listing(args.posts)
+    start = time.process_time()
+    for _ in range(args.repeat):
+        scraper.extract_blog_links(listing, 'https://massmailer.io')
+    links_cpu = (time.process_time() - start) / args.repeat
+
+    with FixtureServer(args.posts, 1, args.paragraphs) as server:
+        urls = [f'{server.base_url}/blog/post-{i % args.posts}/' for i in range(args.repeat)]
+        scraper.scrape_blog_content(urls[0])  # open the connection
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        for url in urls:
+            scraper.scrape_blog_content(url)
+        post_wall = (time.perf_counter() - start_wall) / args.repeat
+        post_cpu = (time.process_time() - start_cpu) / args.repeat
+
+    return {
+        'listing_links': args.posts,
+        'post_bytes': len(synthetic_post(args.paragraphs).encode('utf-8')),
+        'extract_blog_links_cpu_ms': round(links_cpu * 1000, 3),
+        'scrape_blog_content_wall_ms': round(post_wall * 1000, 3),
+        'scrape_blog_content_cpu_ms': round(post_cpu * 1000, 3),
+    }
+
+
+def run_scrape_all_blogs(args):
+    scraper = build_scraper(args)
+    with FixtureServer(args.posts, args.pages, args.paragraphs, args.latency) as server:
+        start = time.perf_counter()
+        blogs = scraper.scrape_all_blogs(server.category_url)
+        elapsed = time.perf_counter() - start
+    pages = len(blogs) + args.pages
+    return {
+        'posts': len(blogs),
+        'pages_fetched': pages,
+        'seconds': round(elapsed, 3),
+        'pages_per_sec': round(pages / elapsed, 2),
+        'peak_rss_mb': peak_rss_mb(),
+        'timings': scraper.timings.to_dict(),
+    }
+
+
+def run_download_csv(args):
+    """Stream a stored result of args.rows posts through /download-csv"""
+    from app import app, result_store
+    from parsing import extract_blog_data
+
+    row = extract_blog_data(synthetic_post(args.paragraphs), 'https://massmailer.io/blog/post/')
+    rows = [dict(row, url=f'https://massmailer.io/blog/post-{i}/') for i in range(args.rows)]
+    result_id = result_store.put(rows)
+    del rows
+    rss_before = peak_rss_mb()
+
+    client = app.test_client()
+    start = time.perf_counter()
+    response = client.get(f'/download-csv?result_id={result_id}', buffered=False)
+    size = sum(len(chunk) for chunk in response.response)
+    response.close()
+    elapsed = time.perf_counter() - start
+    return {
+        'rows': args.rows,
+        'bytes': size,
+        'seconds': round(elapsed, 3),
+        'rows_per_sec': round(args.rows / elapsed, 1),
+        'mb_per_sec': round(size / elapsed / (1024 * 1024), 2),
+        'peak_rss_mb': peak_rss_mb(),
+        'rss_growth_mb': round(peak_rss_mb() - rss_before, 1),
+    }
+
+
+def run_result_memory(args):
+    """Memory held by args.rows posts as plain dicts and as the result store's BlogRecords"""
+    from parsing import extract_blog_data
+    from records import BlogRecord
+
+    row = extract_blog_data(synthetic_post(args.paragraphs), 'https://massmailer.io/blog/post/')
+    encoded = [json.dumps(dict(row, url=f'https://massmailer.io/blog/post-{i}/', title=f'Post {i}'))
+               for i in range(args.rows)]
+
+    def traced(build):
+        tracemalloc.start()
+        rows = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return rows, size
+
+    _, dict_bytes = traced(lambda: [json.loads(line) for line in encoded])
+    records, record_bytes = traced(lambda: [BlogRecord.from_dict(json.loads(line)) for line in encoded])
+    start = time.process_time()
+    for record in records:
+        record.to_dict()
+    return {
+        'rows': args.rows,
+        'dict_mb': round(dict_bytes / (1024 * 1024), 2),
+        'record_mb': round(record_bytes / (1024 * 1024), 2),
+        'reduction': round(dict_bytes / record_bytes, 2),
+        'to_dict_us_per_row': round((time.process_time() - start) / args.rows * 1e6, 2),
+    }
+
+
+def run_case_in_child(case, argv):
+    """Run one case in a fresh interpreter and return its JSON result"""
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--case', case, *argv],
+                               capture_output=True, text=True, env=dict(os.environ, RESULT_STORE_MAX_BYTES=str(2 ** 40)))
+    if completed.returncode != 0:
+        return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'failed'}
+    # The scraper prints fetch errors to stdout; the result is the last line
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, path=''):
+    """Ratio current / baseline for every numeric metric present in both"""
+    ratios = {}
+    for key, value in results.items():
+        old = baseline.get(key) if isinstance(baseline, dict) else None
+        name = f'{path}{key}'
+        if isinstance(value, dict) and isinstance(old, dict):
+            ratios.update(compare(value, old, f'{name}.'))
+        elif isinstance(value, (int, float)) and isinstance(old, (int, float)) and old:
+            ratios[name] = round(value / old, 3)
+    return ratios
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--posts', type=int, default=50, help='posts per category page')
+    arg_parser.add_argument('--pages', type=int, default=2, help='category pages to follow')
+    arg_parser.add_argument('--paragraphs', type=int, default=50, help='paragraphs per post page')
+    arg_parser.add_argument('--latency', type=float, default=0.02, help='seconds added to each response')
+    arg_parser.add_argument('--concurrency', type=int, default=8)
+    arg_parser.add_argument('--rows', type=int, default=10000, help='rows in the /download-csv result')
+    arg_parser.add_argument('--repeat', type=int, default=50)
+    arg_parser.add_argument('--case', choices=CASES, help='run a single case in this process')
+    arg_parser.add_argument('--output', help='also write the JSON results to this file')
+    arg_parser.add_argument('--baseline', help='earlier --output file to compare against')
+    args = arg_parser.parse_args()
+
+    if args.case:
+        print(json.dumps(globals()[f'run_{args.case}'](args)))
+        return
+
+    passthrough = [f'--{name}={getattr(args, name)}'
+                   for name in ('posts', 'pages', 'paragraphs', 'latency', 'concurrency', 'rows', 'repeat')]
+    results = {
+        'config': {name: getattr(args, name)
+                   for name in ('posts', 'pages', 'paragraphs', 'latency', 'concurrency', 'rows', 'repeat')},
+        'python': sys.version.split()[0],
+    }
+    for case in CASES:
+        results[case] = run_case_in_child(case, passthrough)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        results['vs_baseline'] = compare({case: results[case] for case in CASES}, baseline)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""CPU time to turn a large post body into text: decompose + get_text, XPath joins and textextract
+
+Each case gets a freshly parsed tree per run and only the text step is timed,
+since decompose() destroys the tree it works on.
+
+Usage: python benchmarks/bench_text.py [--paragraphs N] [--repeat N]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+from lxml import etree  # noqa: E402
+
+from fixture_server import synthetic_post  # noqa: E402
+from profiles import parse_html  # noqa: E402
+from textextract import count_words, extract_text  # noqa: E402
+
+VISIBLE_TEXT = etree.XPath('.//text()[not(ancestor::script or ancestor::style)]')
+
+
+def soup_body(html_content):
+    return BeautifulSoup(html_content, 'lxml').find('div', class_='post-content')
+
+
+def lxml_body(html_content):
+    return parse_html(html_content).find('.//div[@class="post-content"]')
+
+
+def decompose_get_text(body):
+    """The extraction scrape_blog_content used: drop scripts and styles, then join the stripped strings"""
+    for script in body(['script', 'style']):
+        script.decompose()
+    return body.get_text(strip=True)
+
+
+CASES = {
+    'soup_decompose_get_text': (soup_body, decompose_get_text),
+    'soup_textextract': (soup_body, extract_text),
+    'lxml_xpath_join': (lxml_body, lambda body: ''.join(text.strip() for text in VISIBLE_TEXT(body))),
+    'lxml_textextract': (lxml_body, extract_text),
+    'lxml_textextract_markdown': (lxml_body, lambda body: extract_text(body, markdown=True)),
+}
+
+
+def cpu_time_per_page(build, extract, html_content, repeat):
+    seconds = 0
+    for _ in range(repeat):
+        body = build(html_content)
+        start = time.process_time()
+        text = extract(body)
+        seconds += time.process_time() - start
+    return seconds / repeat, text
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--paragraphs', type=int, default=2000)
+    arg_parser.add_argument('--repeat', type=int, default=10)
+    args = arg_parser.parse_args()
+
+    html_content = synthetic_post(args.paragraphs)
+    results = {}
+    texts = {}
+    for name, (build, extract) in CASES.items():
+        results[name], texts[name] = cpu_time_per_page(build, extract, html_content, args.repeat)
+    if ''.join(texts['soup_decompose_get_text'].split()) != ''.join(texts['lxml_textextract'].split()):
+        sys.exit('textextract output differs from get_text beyond whitespace')
+
+    baseline = results['soup_decompose_get_text']
+    print(json.dumps({
+        'page_bytes': len(html_content),
+        'repeat': args.repeat,
+        'cpu_ms_per_page': {name: round(seconds * 1000, 3) for name, seconds in results.items()},
+        'speedup_vs_decompose': {name: round(baseline / seconds, 2) for name, seconds in results.items()},
+        'paragraphs_kept': {name: text.count('\n\n') + 1 for name, text in texts.items()},
+        'word_count': {name: count_words(text, name.endswith('markdown')) for name, text in texts.items()}
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
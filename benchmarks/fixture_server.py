@@ -0,0 +1,147 @@
+"""Local HTTP server serving synthetic massmailer.io-style category and post pages
+
+Usage: python benchmarks/fixture_server.py [--port N] [--latency S] [--paragraphs N] [--posts N] [--pages N]
+"""
+import argparse
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CATEGORY_PATH = '/blog_categories/benchmark/'
+PAGE_RE = re.compile(r'^/blog_categories/benchmark/(?:page/(\d+)/)?$')
+POST_RE = re.compile(r'^/blog/post-(\d+)/$')
+
+
+def synthetic_post(paragraphs, title='How to improve email deliverability'):
+    """A post page shaped like massmailer.io markup"""
+    nav = ''.join(f'<li><a href="/blog_categories/topic-{i}/">Topic {i}</a></li>' for i in range(20))
+    body = ''.join(
+        f'<p>Paragraph {i} about <a href="/blog/other-{i}/">email deliverability</a> and '
+        f'<strong>sender reputation</strong>. Warm up your domain slowly.</p>'
+        f'<script>track({i});</script>'
+        for i in range(paragraphs)
+    )
+    return f"""<!DOCTYPE html>
+<html><head><title>Benchmark post</title>
+<meta name="description" content="A synthetic post">
+<meta property="og:image" content="https://massmailer.io/img/cover.png">
+<style>body {{ color: #333; }}</style></head>
+<body><header><nav><ul>{nav}</ul></nav></header>
+<main><h1>{title}</h1>
+<span class="post-date">March 3, 2024</span><time datetime="2024-03-03">3 Mar</time>
+<div class="post-content"><p>{title}</p>{body}</div>
+<footer><a href="/category/deliverability/">Deliverability</a></footer></main>
+</body></html>"""
+
+
+def synthetic_listing(posts, start=0, next_page=None):
+    """A category page linking posts start..start+posts, and the next page if there is one"""
+    cards = ''.join(
+        f'<div class="card"><img src="/img/{i}.png"><h2><a href="/blog/post-{i}/">Post {i}</a></h2>'
+        f'<p>Teaser text for post {i}.</p><a href="/blog/post-{i}/">Read more</a></div>'
+        for i in range(start, start + posts)
+    )
+    pager = f'<a class="next" href="{next_page}">Next</a>' if next_page else ''
+    return f'<html><body><nav><a href="/blog/">Blog</a></nav><main>{cards}</main>{pager}</body></html>'
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        fixture = self.server.fixture
+        if fixture.latency:
+            time.sleep(fixture.latency)
+        path = self.path.split('?')[0]
+        page_match = PAGE_RE.match(path)
+        post_match = POST_RE.match(path)
+        if page_match:
+            page = int(page_match.group(1) or 1)
+            if page > fixture.pages:
+                return self.send_body(404, b'')
+            next_page = f'{CATEGORY_PATH}page/{page + 1}/' if page < fixture.pages else None
+            body = synthetic_listing(fixture.posts_per_page, (page - 1) * fixture.posts_per_page, next_page)
+        elif post_match and int(post_match.group(1)) < fixture.total_posts:
+            body = fixture.post_page(int(post_match.group(1)))
+        else:
+            return self.send_body(404, b'')
+        self.send_body(200, body.encode('utf-8'))
+
+    def send_body(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FixtureServer:
+    """Serves a category of synthetic posts on a background thread
+
+    latency is added to every response; paragraphs sets the post page size.
+    """
+
+    def __init__(self, posts_per_page=20, pages=1, paragraphs=50, latency=0.0, host='127.0.0.1', port=0):
+        self.posts_per_page = posts_per_page
+        self.pages = pages
+        self.paragraphs = paragraphs
+        self.latency = latency
+        self.total_posts = posts_per_page * pages
+        # Rendered once so serving a post costs the benchmark process almost nothing
+        self.template = synthetic_post(paragraphs, title='@TITLE@')
+        self.httpd = ThreadingHTTPServer((host, port), FixtureHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fixture = self
+        self.thread = None
+
+    def post_page(self, index):
+        return self.template.replace('@TITLE@', f'Benchmark post {index}')
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def category_url(self):
+        return self.base_url + CATEGORY_PATH
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--port', type=int, default=8765)
+    arg_parser.add_argument('--latency', type=float, default=0.0)
+    arg_parser.add_argument('--paragraphs', type=int, default=50)
+    arg_parser.add_argument('--posts', type=int, default=20, help='posts per category page')
+    arg_parser.add_argument('--pages', type=int, default=1)
+    args = arg_parser.parse_args()
+
+    server = FixtureServer(args.posts, args.pages, args.paragraphs, args.latency, port=args.port)
+    print(f'Serving {server.total_posts} posts at {server.category_url}')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
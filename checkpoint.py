@@ -0,0 +1,140 @@
+import fcntl
+import json
+import os
+import re
+import threading
+
+CHECKPOINT_NAME_RE = re.compile(r'^[\w-]{1,64}$')
+
+
+class CheckpointError(Exception):
+    """Raised when a checkpoint is in use elsewhere or belongs to a different scrape"""
+
+
+class Checkpoint:
+    """Append-only journal of one scrape's progress, so an interrupted scrape can resume
+
+    The journal is NDJSON with one record per line: 'start' (the listing
+    URLs), 'listing' (the post and page links found on a listing page),
+    'post' (a finished post URL and its row, or null) and 'failed' (a failed
+    fetch and its attempt count). Every line is flushed as it is written, so
+    a killed worker loses at most the line in progress; a torn last line is
+    dropped when the journal is loaded.
+
+    While open, the file holds an exclusive flock, which the OS releases if
+    the process dies, so busy() tells a live scrape from an abandoned one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.lock = threading.Lock()
+        self.listings = []  # [(page_url, post links, page links)] in the order they were read
+        self.rows = {}  # post url -> row, or None for posts that gave no row
+        self.failures = {}  # url -> (attempts, error)
+        self.resumed_posts = 0
+        self.resumed_pages = 0
+
+    def busy(self):
+        """True if another live scrape has this checkpoint open"""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, 'rb') as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+            fcntl.flock(f, fcntl.LOCK_UN)
+        return False
+
+    def open(self, roots):
+        """Lock the journal and load what an earlier run of the same scrape recorded"""
+        roots = list(roots)
+        file = open(self.path, 'a+b')
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            file.close()
+            raise CheckpointError('Checkpoint is in use by another scrape')
+        try:
+            started = self._load(file, roots)
+        except Exception:
+            file.close()
+            raise
+        self.file = file
+        if not started:
+            self._write({'type': 'start', 'urls': roots})
+        self.resumed_pages = len(self.listings)
+        self.resumed_posts = len(self.rows)
+        return self
+
+    def _load(self, file, roots):
+        file.seek(0)
+        started = False
+        end = 0
+        for line in iter(file.readline, b''):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if not line.endswith(b'\n'):
+                break
+            end += len(line)
+            kind = record.get('type')
+            if kind == 'start':
+                if record['urls'] != roots:
+                    raise CheckpointError('Checkpoint belongs to a scrape of different URLs')
+                started = True
+            elif kind == 'listing':
+                self.listings.append((record['url'], record['posts'], record['pages']))
+                self.failures.pop(record['url'], None)
+            elif kind == 'post':
+                self.rows[record['url']] = record['row']
+                self.failures.pop(record['url'], None)
+            elif kind == 'failed':
+                self.failures[record['url']] = (record['attempts'], record['error'])
+        # Drop a line cut short by a crash so new records start on a fresh line
+        file.truncate(end)
+        return started
+
+    def _write(self, record):
+        line = json.dumps(record, separators=(',', ':')).encode('utf-8') + b'\n'
+        with self.lock:
+            if self.file is not None:
+                self.file.write(line)
+                self.file.flush()
+
+    def listing(self, page_url, post_links, page_links):
+        self._write({'type': 'listing', 'url': page_url, 'posts': post_links, 'pages': page_links})
+
+    def post(self, url, row):
+        self._write({'type': 'post', 'url': url, 'row': row})
+
+    def failed(self, url, attempts, error):
+        self._write({'type': 'failed', 'url': url, 'attempts': attempts, 'error': error})
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.flush()
+                os.fsync(self.file.fileno())
+                self.file.close()
+                self.file = None
+
+    def discard(self):
+        """Close and delete the journal once the scrape's results are stored elsewhere"""
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def stats(self):
+        return {'resumed_pages': self.resumed_pages, 'resumed_posts': self.resumed_posts}
+
+
+def checkpoint_path(directory, name):
+    """Journal path for a checkpoint name, or raise ValueError for unsafe names"""
+    if not isinstance(name, str) or not CHECKPOINT_NAME_RE.match(name):
+        raise ValueError('checkpoint must be 1-64 letters, digits, _ or -')
+    return os.path.join(directory, f'{name}.ndjson')
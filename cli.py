@@ -0,0 +1,205 @@
+"""Scrape listing URLs from the command line, streaming posts straight to a file
+
+URLs are read one per line from URLS_FILE (default stdin; blank lines and #
+comments are skipped) and/or given with --url, and crawled as one batch that
+shares connections, rate limits and deduplication. Posts are written as they
+arrive: CSV, NDJSON or Parquet to --output (default stdout), or into a
+SQLite archive with full-text search that POST_ARCHIVE_PATH can serve.
+
+Usage: python cli.py [OPTIONS] [URLS_FILE]
+       python cli.py urls.txt -o posts.sqlite --concurrency 16 --checkpoint nightly.ndjson
+"""
+import contextlib
+import os
+import sys
+import time
+
+import click
+
+from archive import PostArchive
+from checkpoint import Checkpoint, CheckpointError
+from dedupe import DEDUPE_MODES, EXACT
+from discovery import DISCOVERY_MODES, HTML
+from exporters import ExportError, iter_export
+from textextract import CONTENT_FORMATS, TEXT
+
+OUTPUT_FORMATS = ('csv', 'ndjson', 'parquet', 'sqlite')
+EXTENSION_FORMATS = {
+    '.csv': 'csv',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+    '.parquet': 'parquet',
+    '.sqlite': 'sqlite',
+    '.sqlite3': 'sqlite',
+    '.db': 'sqlite',
+}
+
+
+def read_urls(urls_file, extra_urls):
+    """Listing URLs from a file of one URL per line plus --url options, without repeats"""
+    urls = list(extra_urls)
+    if urls_file is not None:
+        for line in urls_file:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                urls.append(line)
+    return list(dict.fromkeys(urls))
+
+
+def output_format(fmt, output):
+    if fmt:
+        return fmt
+    if output != '-':
+        extension = os.path.splitext(output)[1].lower()
+        if extension in EXTENSION_FORMATS:
+            return EXTENSION_FORMATS[extension]
+    if output != '-':
+        raise click.UsageError(f'Cannot tell the format of {output}; pass --format')
+    return 'csv'
+
+
+class Progress:
+    """Posts written and the rate so far, echoed to stderr every `every` posts"""
+
+    def __init__(self, every):
+        self.every = every
+        self.started = time.monotonic()
+        self.done = 0
+        self.total = 0
+        self.written = 0
+
+    def update(self, done, total, written):
+        self.done, self.total = done, total
+        if written:
+            self.written += 1
+            if self.every and self.written % self.every == 0:
+                elapsed = time.monotonic() - self.started
+                click.echo(f'{self.written} posts ({done}/{total} done), {self.written / elapsed:.1f} posts/s',
+                           err=True)
+
+
+def iter_rows(scraper, urls, progress):
+    for done, total, blog_data in scraper.iter_batch(urls):
+        progress.update(done, total, bool(blog_data))
+        if blog_data:
+            yield blog_data
+
+
+def write_file(rows, fmt, output):
+    # Open stdout before it is redirected below
+    with click.open_file(output, 'wb') as f, contextlib.redirect_stdout(sys.stderr):
+        for chunk in iter_export(rows, fmt):
+            f.write(chunk)
+
+
+def write_sqlite(scraper, rows, output):
+    # The scraper's own archive hook stores each post with the listing it came from
+    archive = scraper.archive = PostArchive(output)
+    with contextlib.redirect_stdout(sys.stderr):
+        for _ in rows:
+            pass
+    archive.flush()
+
+
+def summary_lines(scraper, progress, elapsed, interrupted):
+    fetch = scraper.fetch_stats.to_dict()
+    retries = scraper.retries.stats()
+    duplicates = scraper.duplicates.stats()
+    elapsed = max(elapsed, 1e-9)
+    lines = [
+        f"{'Interrupted' if interrupted else 'Finished'} in {elapsed:.1f}s",
+        f'posts written   {progress.written} of {progress.done} done ({progress.total} found)',
+        f"pages fetched   {fetch['pages']} ({fetch['bytes'] / (1024 * 1024):.1f} MB)",
+        f"throughput      {progress.written / elapsed:.2f} posts/s, {fetch['pages'] / elapsed:.2f} pages/s, "
+        f"{fetch['bytes'] / elapsed / (1024 * 1024):.2f} MB/s",
+        f"errors          {fetch['errors']} fetch errors, {sum(fetch['aborts'].values())} aborted, "
+        f"{len(retries['failed'])} URLs failed after {retries['rounds']} retry rounds",
+        f"duplicates      {sum(duplicates.values())} dropped",
+    ]
+    for stage, timing in scraper.timings.to_dict().items():
+        lines.append(f"{stage:<15} {timing['seconds']:.2f}s over {timing['count']}")
+    return lines
+
+
+@click.command(help=__doc__.split('\nUsage:')[0])
+@click.argument('urls_file', type=click.File('r'), required=False)
+@click.option('-u', '--url', 'extra_urls', multiple=True, help='Listing URL to scrape; may be repeated.')
+@click.option('-o', '--output', default='-', show_default=True, help='Output file, - for stdout.')
+@click.option('-f', '--format', 'fmt', type=click.Choice(OUTPUT_FORMATS),
+              help='Output format; guessed from the output file extension, csv for stdout.')
+@click.option('-c', '--concurrency', default=8, show_default=True, help='Pages fetched at once.')
+@click.option('--requests-per-second', default=2.0, show_default=True, help='Starting request rate per host.')
+@click.option('--max-requests-per-second', default=10.0, show_default=True, help='Fastest request rate per host.')
+@click.option('--max-in-flight-per-host', default=2, show_default=True, help='Concurrent requests per host.')
+@click.option('--max-pages', default=1, show_default=True, help='Listing pages followed per URL.')
+@click.option('--max-posts', type=int, help='Posts scraped per URL.')
+@click.option('--discovery', type=click.Choice(DISCOVERY_MODES), default=HTML, show_default=True,
+              help='auto also reads sitemaps and feeds.')
+@click.option('--dedupe', type=click.Choice(DEDUPE_MODES), default=EXACT, show_default=True)
+@click.option('--max-attempts', default=3, show_default=True, help='Fetches per URL before giving up.')
+@click.option('--content-format', type=click.Choice(CONTENT_FORMATS), default=TEXT, show_default=True,
+              help='Post content as plain text or Markdown.')
+@click.option('--respect-robots/--ignore-robots', default=True, show_default=True)
+@click.option('--checkpoint', type=click.Path(dir_okay=False),
+              help='Journal file; rerunning with the same file resumes an interrupted scrape.')
+@click.option('--progress', 'progress_every', default=0, help='Report progress to stderr every N posts.')
+def main(urls_file, extra_urls, output, fmt, concurrency, requests_per_second, max_requests_per_second,
+         max_in_flight_per_host, max_pages, max_posts, discovery, dedupe, max_attempts, content_format,
+         respect_robots, checkpoint, progress_every):
+    if urls_file is None and not extra_urls:
+        urls_file = click.get_text_stream('stdin')
+    urls = read_urls(urls_file, extra_urls)
+    if not urls:
+        raise click.UsageError('No URLs given')
+    fmt = output_format(fmt, output)
+    if fmt == 'sqlite' and output == '-':
+        raise click.UsageError('SQLite output needs an --output file')
+
+    # Import the engine only once the arguments are known; it reads its configuration on import
+    from engine import build_scraper
+
+    try:
+        scraper = build_scraper({
+            'concurrency': concurrency,
+            'requests_per_second': requests_per_second,
+            'max_requests_per_second': max_requests_per_second,
+            'max_in_flight_per_host': max_in_flight_per_host,
+            'respect_robots': respect_robots,
+            'max_pages': max_pages,
+            'max_posts': max_posts,
+            'discovery': discovery,
+            'dedupe': dedupe,
+            'max_attempts': max_attempts,
+            'content_format': content_format,
+            'archive': False,
+        }, Checkpoint(checkpoint) if checkpoint else None)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+
+    progress = Progress(progress_every)
+    rows = iter_rows(scraper, urls, progress)
+    started = time.monotonic()
+    interrupted = False
+    try:
+        # The scraper reports fetch errors with print(); both writers keep them out of output on stdout
+        if fmt == 'sqlite':
+            write_sqlite(scraper, rows, output)
+        else:
+            write_file(rows, fmt, output)
+    except KeyboardInterrupt:
+        interrupted = True
+    except (CheckpointError, ExportError) as e:
+        raise click.ClickException(str(e))
+    finally:
+        rows.close()
+
+    for line in summary_lines(scraper, progress, time.monotonic() - started, interrupted):
+        click.echo(line, err=True)
+    if interrupted:
+        sys.exit(130)
+    if scraper.checkpoint:
+        scraper.checkpoint.discard()
+
+
+if __name__ == '__main__':
+    main()
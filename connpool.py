@@ -0,0 +1,80 @@
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Connection': 'keep-alive'
+}
+
+
+class SessionPool:
+    """One requests.Session with keep-alive connection pools shared by every scrape
+
+    pool_maxsize is the number of connections kept open per host and
+    pool_connections the number of hosts whose pools are kept. Failed GETs
+    are retried with exponential backoff. 429 and 503 are not retried here:
+    the scraper's per-host limiter backs off the whole host and retries them.
+    """
+
+    def __init__(self, pool_connections=32, pool_maxsize=32, retries=3, backoff_factor=0.5,
+                 status_forcelist=(500, 502, 504)):
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=status_forcelist,
+            allowed_methods=['GET', 'HEAD'],
+            # Retry-After comes with 429/503, which the scraper's limiter handles
+            respect_retry_after_header=False,
+            raise_on_status=False
+        )
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                   max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+
+    def stats(self):
+        """Connections opened versus requests sent, per host and in total"""
+        hosts = {}
+        pools = self.adapter.poolmanager.pools
+        with pools.lock:
+            host_pools = [(key, pools[key]) for key in list(pools.keys())]
+        for key, pool in host_pools:
+            hosts[f"{key.key_scheme}://{key.key_host}:{key.key_port}"] = {
+                'connections_opened': pool.num_connections,
+                'requests': pool.num_requests,
+                'idle_connections': pool.pool.qsize() if pool.pool else 0
+            }
+        opened = sum(host['connections_opened'] for host in hosts.values())
+        sent = sum(host['requests'] for host in hosts.values())
+        return {
+            'connections_opened': opened,
+            'requests': sent,
+            'reused_requests': max(0, sent - opened),
+            'reuse_rate': round((sent - opened) / sent, 4) if sent else 0.0,
+            'hosts': hosts
+        }
+
+    def close(self):
+        self.session.close()
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_session_pool():
+    """The process-wide SessionPool, sized from HTTP_POOL_MAXSIZE and HTTP_RETRIES"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = SessionPool(
+                pool_maxsize=int(os.environ.get('HTTP_POOL_MAXSIZE', 32)),
+                retries=int(os.environ.get('HTTP_RETRIES', 3))
+            )
+        return _shared_pool
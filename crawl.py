@@ -0,0 +1,348 @@
+import hashlib
+import math
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from urllib.parse import parse_qs, urljoin, urlparse
+
+PAGE_PATH_RE = re.compile(r'^(.*?)/page/(\d+)/?$')
+PAGE_QUERY_KEYS = ('page', 'paged')
+
+
+def _url_hash(url):
+    return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HashedUrlSet:
+    """Seen-set that keeps a 64-bit hash per URL instead of the URL string"""
+
+    def __init__(self):
+        self.hashes = set()
+
+    def add(self, url):
+        """Add a URL, returning False if it was already present"""
+        digest = _url_hash(url)
+        if digest in self.hashes:
+            return False
+        self.hashes.add(digest)
+        return True
+
+    def __contains__(self, url):
+        return _url_hash(url) in self.hashes
+
+    def __len__(self):
+        return len(self.hashes)
+
+
+class BloomFilter:
+    """Fixed-size probabilistic seen-set for very large crawls
+
+    May report an unseen URL as seen with probability about error_rate once
+    capacity URLs have been added, so a few pages can be skipped; never the
+    other way round.
+    """
+
+    def __init__(self, capacity=1000000, error_rate=0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, url):
+        digest = hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'big')
+        second = int.from_bytes(digest[8:], 'big') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, url):
+        """Add a URL, returning False if it was (probably) already present"""
+        positions = self._positions(url)
+        if all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in positions):
+            return False
+        for pos in positions:
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+        return True
+
+    def __contains__(self, url):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(url))
+
+    def __len__(self):
+        return self.count
+
+
+class Frontier:
+    """Deduplicating queues of listing pages and post URLs with crawl budgets
+
+    post_key, if given, maps a post URL to the key it is deduplicated on;
+    the URL itself is what gets queued.
+    """
+
+    def __init__(self, max_pages=1, max_posts=None, seen=None, post_key=None):
+        self.max_pages = max_pages
+        self.max_posts = max_posts
+        self.seen = seen if seen is not None else HashedUrlSet()
+        self.post_key = post_key
+        self.pages = deque()
+        self.posts = deque()
+        self.pages_queued = 0
+        self.posts_queued = 0
+        self.root = None
+
+    def add_page(self, url):
+        if self.pages_queued >= self.max_pages or not self.seen.add(url):
+            return False
+        if self.root is None:
+            self.root = url
+        self.pages.append(url)
+        self.pages_queued += 1
+        return True
+
+    def is_root(self, page_url):
+        """True for the listing URL the crawl started from"""
+        return page_url == self.root
+
+    def for_page(self, page_url):
+        """The frontier that links found on page_url are added to"""
+        return self
+
+    def sources_of(self, post_url):
+        return [self.root]
+
+    def add_post(self, url):
+        if self.max_posts is not None and self.posts_queued >= self.max_posts:
+            return False
+        if not self.seen.add(self.post_key(url) if self.post_key else url):
+            return False
+        self.posts.append(url)
+        self.posts_queued += 1
+        return True
+
+    def post_budget_spent(self):
+        return self.max_posts is not None and self.posts_queued >= self.max_posts
+
+
+class HostQueue:
+    """FIFO of URLs that hands them out round-robin across hosts"""
+
+    def __init__(self):
+        self.queues = OrderedDict()
+        self.length = 0
+
+    def append(self, url):
+        self.queues.setdefault(urlparse(url).netloc, deque()).append(url)
+        self.length += 1
+
+    def popleft(self):
+        host, queue = next(iter(self.queues.items()))
+        url = queue.popleft()
+        if queue:
+            self.queues.move_to_end(host)
+        else:
+            del self.queues[host]
+        self.length -= 1
+        return url
+
+    def __len__(self):
+        return self.length
+
+
+class BatchFrontier:
+    """One frontier for several listing URLs crawled together
+
+    Pages and posts are deduplicated across the whole batch, so a post linked
+    from several listings is fetched once and attributed to all of them.
+    max_pages and max_posts apply to each listing; posts are handed out
+    round-robin across hosts. post_key works as for Frontier.
+    """
+
+    def __init__(self, max_pages=1, max_posts=None, seen=None, post_key=None):
+        self.max_pages = max_pages
+        self.max_posts = max_posts
+        self.seen = seen if seen is not None else HashedUrlSet()
+        self.post_key = post_key
+        self.pages = deque()
+        self.posts = HostQueue()
+        self.pages_queued = 0
+        self.posts_queued = 0
+        self.sources = {}
+        self.page_sources = {}
+        self.post_sources = {}
+
+    def add_root(self, url):
+        if url in self.sources:
+            return False
+        self.sources[url] = SourceFrontier(self, url)
+        return self.sources[url].add_page(url)
+
+    def is_root(self, page_url):
+        return page_url in self.sources
+
+    def for_page(self, page_url):
+        return self.sources[self.page_sources[page_url]]
+
+    def sources_of(self, post_url):
+        """Listing URLs that linked post_url, in the order they were found"""
+        return self.post_sources.get(self.post_key(post_url) if self.post_key else post_url, [])
+
+
+class SourceFrontier:
+    """The view of a BatchFrontier for one listing URL, holding its budgets"""
+
+    def __init__(self, batch, root):
+        self.batch = batch
+        self.root = root
+        self.max_pages = batch.max_pages
+        self.max_posts = batch.max_posts
+        self.pages_queued = 0
+        self.posts_queued = 0
+
+    def add_page(self, url):
+        if self.pages_queued >= self.max_pages or not self.batch.seen.add(url):
+            return False
+        self.batch.pages.append(url)
+        self.batch.page_sources[url] = self.root
+        self.batch.pages_queued += 1
+        self.pages_queued += 1
+        return True
+
+    def add_post(self, url):
+        if self.post_budget_spent():
+            return False
+        key = self.batch.post_key(url) if self.batch.post_key else url
+        sources = self.batch.post_sources.setdefault(key, [])
+        if self.root not in sources:
+            sources.append(self.root)
+        if not self.batch.seen.add(key):
+            return False
+        self.batch.posts.append(url)
+        self.batch.posts_queued += 1
+        self.posts_queued += 1
+        return True
+
+    def post_budget_spent(self):
+        return self.max_posts is not None and self.posts_queued >= self.max_posts
+
+
+PAGE = 'page'
+POST = 'post'
+
+
+class RetryQueue:
+    """URLs whose fetch failed, handed back for another try up to max_attempts fetches each
+
+    Only transient failures are retried. Each round of retries waits twice as
+    long as the one before, starting at delay seconds.
+    """
+
+    def __init__(self, max_attempts=3, delay=1.0, max_delay=60.0):
+        self.max_attempts = max(1, int(max_attempts))
+        self.delay = delay
+        self.max_delay = max_delay
+        self.attempts = {}
+        self.errors = {}
+        self.pending = {}  # url -> PAGE or POST, in the order they failed
+        self.rounds = 0
+        self.recovered = 0
+        self.lock = threading.Lock()
+
+    def failed(self, url, kind, error, transient=True):
+        """Count a failed fetch; returns True if the URL will be tried again"""
+        with self.lock:
+            attempts = self.attempts[url] = self.attempts.get(url, 0) + 1
+            self.errors[url] = error
+            if transient and attempts < self.max_attempts:
+                self.pending[url] = kind
+                return True
+            return False
+
+    def succeeded(self, url):
+        with self.lock:
+            if self.errors.pop(url, None) is not None:
+                self.recovered += 1
+
+    def seed(self, url, attempts, error):
+        """Restore a failure recorded by an earlier, interrupted run"""
+        with self.lock:
+            self.attempts[url] = attempts
+            self.errors[url] = error
+
+    def forget(self, url):
+        """(error, would retry) for url's failed fetch, dropping it from the queue; None if it did not fail
+
+        For callers that schedule their own retries, such as distributed workers.
+        """
+        with self.lock:
+            error = self.errors.pop(url, None)
+            self.attempts.pop(url, None)
+            retry = self.pending.pop(url, None) is not None
+        return (error, retry) if error is not None else None
+
+    def is_pending(self, url):
+        with self.lock:
+            return url in self.pending
+
+    def exhausted(self, url):
+        with self.lock:
+            return self.attempts.get(url, 0) >= self.max_attempts
+
+    def take(self):
+        """[(url, kind)] due for another try, after sleeping out this round's backoff"""
+        with self.lock:
+            due = list(self.pending.items())
+            if not due:
+                return []
+            self.pending.clear()
+            wait = min(self.max_delay, self.delay * 2 ** self.rounds)
+            self.rounds += 1
+        time.sleep(wait)
+        return due
+
+    def stats(self):
+        with self.lock:
+            return {
+                'rounds': self.rounds,
+                'recovered': self.recovered,
+                'failed': [{'url': url, 'attempts': self.attempts[url], 'error': error}
+                           for url, error in self.errors.items()]
+            }
+
+
+def pagination_key(url):
+    """(path without the page part, page number) for paginated listing URLs, else None"""
+    parsed = urlparse(url)
+    match = PAGE_PATH_RE.match(parsed.path)
+    if match:
+        return match.group(1) or '/', int(match.group(2))
+    query = parse_qs(parsed.query)
+    for key in PAGE_QUERY_KEYS:
+        if key in query and query[key][0].isdigit():
+            return parsed.path, int(query[key][0])
+    return None
+
+
+def is_pagination_url(url):
+    return pagination_key(url) is not None
+
+
+def find_pagination_links(soup, page_url):
+    """Listing URLs that continue page_url: rel=next, /page/N/ and ?page=N links on the same listing"""
+    parsed_page = urlparse(page_url)
+    page_key = pagination_key(page_url)
+    listing_path = (page_key[0] if page_key else parsed_page.path).rstrip('/') or '/'
+
+    links = []
+    for tag in soup.find_all(['a', 'link'], href=True):
+        href = urljoin(page_url, tag['href'])
+        parsed = urlparse(href)
+        if parsed.netloc != parsed_page.netloc:
+            continue
+        rel = tag.get('rel') or []
+        if 'next' in rel:
+            links.append(href)
+            continue
+        key = pagination_key(href)
+        if key and (key[0].rstrip('/') or '/') == listing_path:
+            links.append(href.split('#')[0])
+    return list(dict.fromkeys(links))
@@ -0,0 +1,164 @@
+import hashlib
+import re
+import threading
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+CANONICAL = 'canonical'
+EXACT = 'exact'
+NEAR = 'near'
+
+DEDUPE_MODES = ('off', EXACT, NEAR)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+# Query parameters that only track where a visitor came from; any other parameter may name the post
+TRACKING_PARAMS = frozenset(['fbclid', 'gclid', 'msclkid', 'mc_cid', 'mc_eid', '_ga', 'ref'])
+
+CANONICAL_LINK_RE = re.compile(r'<link\b[^>]*\brel\s*=\s*["\']?canonical\b[^>]*>', re.I)
+HREF_RE = re.compile(r'\bhref\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))', re.I)
+WORD_RE = re.compile(r'\w+', re.U)
+
+SIMHASH_BITS = 64
+# A post needs this many shingles before it is compared for near-duplicates
+MIN_SHINGLES = 20
+
+_FIELD_BITS = 32
+_SPREAD = [sum((byte >> bit & 1) << bit * _FIELD_BITS for bit in range(8)) for byte in range(256)]
+
+
+def _scheme_netloc(url):
+    """Lowercased scheme and host[:port], without the scheme's default port"""
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    return scheme, host if port is None or port == DEFAULT_PORTS.get(scheme) else f'{host}:{port}'
+
+
+def canonicalize_url(url, base_url=None):
+    """Canonical form of a post URL for deduplication, never for fetching
+
+    Lowercases the scheme and host, drops default ports, the fragment and
+    tracking parameters (utm_* and TRACKING_PARAMS), sorts the rest of the
+    query and gives extension-less paths a trailing slash. A same-host link
+    takes base_url's scheme, so http:// and https:// copies collapse.
+    """
+    scheme, netloc = _scheme_netloc(url)
+    if base_url:
+        base_scheme, base_netloc = _scheme_netloc(base_url)
+        if base_netloc == netloc and base_scheme:
+            scheme = base_scheme
+    path = re.sub(r'/{2,}', '/', urlsplit(url).path) or '/'
+    if not path.endswith('/') and '.' not in path.rsplit('/', 1)[-1]:
+        path += '/'
+    query = sorted((name, value) for name, value in parse_qsl(urlsplit(url).query, keep_blank_values=True)
+                   if name.lower() not in TRACKING_PARAMS and not name.lower().startswith('utm_'))
+    return urlunsplit((scheme, netloc, path, urlencode(query), ''))
+
+
+def url_key(url):
+    """Seen-set and duplicate key of a post URL: its canonical form without the scheme"""
+    return canonicalize_url(url).split('://', 1)[-1]
+
+
+def canonical_link(html_content, page_url):
+    """The <link rel="canonical"> URL of a page, resolved against page_url, or None"""
+    head_end = html_content.find('</head>')
+    match = CANONICAL_LINK_RE.search(html_content, 0, head_end if head_end != -1 else len(html_content))
+    if not match:
+        return None
+    href = HREF_RE.search(match.group(0))
+    if not href:
+        return None
+    value = next(group for group in href.groups() if group is not None).strip()
+    return urljoin(page_url, value) if value else None
+
+
+def _words(text):
+    return WORD_RE.findall(text.lower())
+
+
+def content_fingerprint(text):
+    """Exact-duplicate key for post text, ignoring case and whitespace"""
+    return hashlib.blake2b(' '.join(_words(text)).encode('utf-8'), digest_size=16).digest()
+
+
+def simhash(text, shingle_size=3):
+    """64-bit SimHash over word shingles, or None if the text is too short to compare"""
+    words = _words(text)
+    shingles = {' '.join(words[i:i + shingle_size]) for i in range(max(0, len(words) - shingle_size + 1))}
+    if len(shingles) < MIN_SHINGLES:
+        return None
+    # Count set bits per position for all shingles at once: each hash bit is
+    # spread into its own _FIELD_BITS-wide field of one big integer and summed
+    totals = 0
+    for shingle in shingles:
+        digest = hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest()
+        totals += sum(_SPREAD[byte] << (index * 8 * _FIELD_BITS) for index, byte in enumerate(digest))
+    mask = (1 << _FIELD_BITS) - 1
+    half = len(shingles) / 2
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if (totals >> bit * _FIELD_BITS & mask) > half)
+
+
+class DuplicateDetector:
+    """Spots posts already seen in a scrape by canonical URL, exact text or near-identical text
+
+    Near-duplicates are SimHashes within max_distance bits. The hash is split
+    into max_distance + 1 bands; any two hashes that close agree on at least
+    one band, so only posts sharing a band are compared.
+    """
+
+    def __init__(self, mode=EXACT, max_distance=3):
+        if mode not in DEDUPE_MODES:
+            raise ValueError(f"dedupe must be one of {', '.join(DEDUPE_MODES)}")
+        self.mode = mode
+        self.max_distance = max_distance
+        self.band_bits = SIMHASH_BITS // (max_distance + 1)
+        self.canonical_urls = {}
+        self.fingerprints = {}
+        self.bands = {}
+        self.counts = dict.fromkeys([CANONICAL, EXACT, NEAR], 0)
+        self.lock = threading.Lock()
+
+    def _band_keys(self, value):
+        mask = (1 << self.band_bits) - 1
+        return [(band, value >> band * self.band_bits & mask) for band in range(self.max_distance + 1)]
+
+    def check(self, url, content, canonical=None):
+        """Return (kind, original_url) if the post duplicates an earlier one, else record it and return None"""
+        if self.mode == 'off':
+            return None
+        fingerprint = content_fingerprint(content) if content else None
+        signature = simhash(content) if content and self.mode == NEAR else None
+        with self.lock:
+            duplicate = None
+            if canonical and canonical in self.canonical_urls:
+                duplicate = CANONICAL, self.canonical_urls[canonical]
+            elif fingerprint and fingerprint in self.fingerprints:
+                duplicate = EXACT, self.fingerprints[fingerprint]
+            elif signature is not None:
+                for key in self._band_keys(signature):
+                    for other, other_url in self.bands.get(key, ()):
+                        if bin(signature ^ other).count('1') <= self.max_distance:
+                            duplicate = NEAR, other_url
+                            break
+                    if duplicate:
+                        break
+            if duplicate:
+                self.counts[duplicate[0]] += 1
+                return duplicate
+
+            if canonical:
+                self.canonical_urls[canonical] = url
+            if fingerprint:
+                self.fingerprints[fingerprint] = url
+            if signature is not None:
+                for key in self._band_keys(signature):
+                    self.bands.setdefault(key, []).append((signature, url))
+            return None
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counts)
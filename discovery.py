@@ -0,0 +1,164 @@
+from urllib.parse import urljoin, urlparse
+
+from lxml import etree
+
+from parsing import BLOG_FIELDS, make_soup
+from textextract import MARKDOWN, TEXT, extract_text, text_stats
+
+# 'html' reads post links from listing pages only; 'auto' tries sitemaps and feeds first
+HTML = 'html'
+AUTO = 'auto'
+DISCOVERY_MODES = (HTML, AUTO)
+
+FEED_TYPES = ('application/rss+xml', 'application/atom+xml')
+SITEMAP_PATHS = ('/sitemap.xml', '/sitemap_index.xml')
+
+NAMESPACES = {
+    'atom': 'http://www.w3.org/2005/Atom',
+    'content': 'http://purl.org/rss/1.0/modules/content/',
+    'dc': 'http://purl.org/dc/elements/1.1/',
+    'media': 'http://search.yahoo.com/mrss/',
+}
+
+
+def _local_name(element):
+    return etree.QName(element).localname
+
+
+def _text(element):
+    return (element.text or '').strip() if element is not None else ''
+
+
+def feed_links_from_soup(soup, page_url):
+    """RSS/Atom feed URLs advertised with <link rel="alternate"> on a page"""
+    links = []
+    for tag in soup.find_all('link', href=True):
+        if 'alternate' in (tag.get('rel') or []) and tag.get('type') in FEED_TYPES:
+            links.append(urljoin(page_url, tag['href']))
+    return list(dict.fromkeys(links))
+
+
+def guess_feed_url(page_url):
+    """The WordPress-style feed for a listing page, e.g. /category/x/feed/"""
+    return page_url.split('?')[0].split('#')[0].rstrip('/') + '/feed/'
+
+
+def sitemaps_from_robots(robots_text):
+    return [line.split(':', 1)[1].strip() for line in robots_text.splitlines()
+            if line.lower().startswith('sitemap:')]
+
+
+def default_sitemap_urls(page_url):
+    parsed = urlparse(page_url)
+    return [f"{parsed.scheme}://{parsed.netloc}{path}" for path in SITEMAP_PATHS]
+
+
+def html_to_text(html_content, parser=None, markdown=False):
+    """Text (or Markdown) of an HTML fragment and its first image, extracted like post pages"""
+    soup = make_soup(html_content, parser)
+    first_img = soup.find('img')
+    return extract_text(soup, markdown), (first_img.get('src', '') if first_img else '')
+
+
+def _feed_entry(item, feed_url, parser, content_format=TEXT):
+    """Map an RSS <item> or Atom <entry> to blog fields plus a has_content flag"""
+    blog_data = dict.fromkeys(BLOG_FIELDS, '')
+    categories = []
+    content_html = ''
+    summary_html = ''
+    image = ''
+    for child in item:
+        if not isinstance(child.tag, str):
+            continue
+        name = _local_name(child)
+        if etree.QName(child).namespace == NAMESPACES['media']:
+            if name in ('content', 'thumbnail') and child.get('url'):
+                image = image or child.get('url')
+        elif name == 'title':
+            blog_data['title'] = make_soup(child.text or '', parser).get_text(strip=True)
+        elif name == 'link':
+            href = child.get('href')
+            if href is None:
+                blog_data['url'] = _text(child)
+            elif child.get('rel', 'alternate') == 'alternate' and not blog_data['url']:
+                blog_data['url'] = urljoin(feed_url, href)
+        elif name in ('pubDate', 'published', 'date') or (name == 'updated' and not blog_data['date']):
+            blog_data['date'] = _text(child)
+        elif name == 'category':
+            term = child.get('term') or _text(child)
+            if term:
+                categories.append(term)
+        elif name in ('encoded', 'content'):
+            content_html = child.text or ''
+        elif name in ('description', 'summary'):
+            summary_html = child.text or ''
+        elif name == 'enclosure' and (child.get('type') or '').startswith('image/'):
+            image = image or child.get('url', '')
+
+    blog_data['categories'] = ', '.join(categories)
+    if summary_html:
+        blog_data['meta_description'] = html_to_text(summary_html, parser)[0]
+    if content_html:
+        blog_data['content'], first_img = html_to_text(content_html, parser, content_format == MARKDOWN)
+        blog_data.update(text_stats(blog_data['content'], content_format == MARKDOWN))
+        if not image and first_img:
+            image = urljoin(blog_data['url'], first_img) if first_img.startswith('/') else first_img
+    blog_data['featured_image'] = image
+    return blog_data, bool(content_html)
+
+
+def parse_feed(xml_content, feed_url, parser=None, content_format=TEXT):
+    """Parse an RSS or Atom feed into [(blog_data, has_content)]"""
+    xml_parser = etree.XMLParser(resolve_entities=False, no_network=True, recover=True)
+    root = etree.fromstring(xml_content, parser=xml_parser)
+    if root is None:
+        return []
+    items = [element for element in root.iter() if isinstance(element.tag, str) and
+             _local_name(element) in ('item', 'entry')]
+    entries = [_feed_entry(item, feed_url, parser, content_format) for item in items]
+    return [(blog_data, has_content) for blog_data, has_content in entries if blog_data['url']]
+
+
+def iter_sitemap(stream):
+    """Yield ('url' | 'sitemap', loc) pairs from a sitemap or sitemap index, parsed incrementally"""
+    for _, element in etree.iterparse(stream, events=('end',), tag=('{*}url', '{*}sitemap'),
+                                      resolve_entities=False, no_network=True, recover=True):
+        loc = next((_text(child) for child in element
+                    if isinstance(child.tag, str) and _local_name(child) == 'loc'), '')
+        if loc:
+            yield _local_name(element), loc
+        # Free parsed siblings so memory stays flat on huge sitemaps
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+
+def iter_sitemap_urls(open_stream, sitemap_urls, max_sitemaps=50):
+    """Yield page URLs from sitemaps, following sitemap indexes up to max_sitemaps files
+
+    open_stream(url) is a context manager yielding a binary file object.
+    """
+    queue = list(sitemap_urls)
+    seen = set()
+    while queue and len(seen) < max_sitemaps:
+        sitemap_url = queue.pop(0)
+        if sitemap_url in seen:
+            continue
+        seen.add(sitemap_url)
+        try:
+            with open_stream(sitemap_url) as stream:
+                for kind, loc in iter_sitemap(stream):
+                    if kind == 'sitemap':
+                        queue.append(loc)
+                    else:
+                        yield loc
+        except Exception as e:
+            print(f"Error reading sitemap {sitemap_url}: {e}")
+
+
+def in_listing_scope(url, listing_url):
+    """True if url is a page below the listing's path on the same host"""
+    parsed, listing = urlparse(url), urlparse(listing_url)
+    listing_path = listing.path.rstrip('/') + '/'
+    return (parsed.netloc == listing.netloc and parsed.path.startswith(listing_path) and
+            parsed.path.rstrip('/') + '/' != listing_path)
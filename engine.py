@@ -0,0 +1,828 @@
+"""Scraping engine shared by the web app, the command-line runner and distributed workers
+
+Holds MassMailerScraper, build_scraper and the process-wide state scrapes
+share: the HTTP cache, robots.txt cache, seen index and post archive, each
+configured from the environment. It imports nothing from the web app, so
+cli.py and worker.py can use it without starting job runners or stores.
+"""
+import gzip
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from urllib.parse import urljoin, urlparse
+
+import requests
+from lxml import etree
+
+from archive import PostArchive
+from connpool import get_session_pool
+from crawl import (PAGE, POST, BatchFrontier, BloomFilter, Frontier, HashedUrlSet, RetryQueue, find_pagination_links,
+                   is_pagination_url)
+from dedupe import DEDUPE_MODES, EXACT, DuplicateDetector, canonical_link, url_key
+from discovery import (DISCOVERY_MODES, HTML, default_sitemap_urls, feed_links_from_soup, guess_feed_url, in_listing_scope,
+                       iter_sitemap_urls, parse_feed, sitemaps_from_robots)
+from fetching import (DISALLOWED, THROTTLED, FetchAborted, FetchLimits, FetchStats, LimitedReader, check_headers,
+                      decode_body, download_deadline, is_transient, read_body)
+from httpcache import FETCHED, FRESH, REVALIDATED, HttpCache
+from incremental import IncrementalPlan, SeenIndex
+from metrics import CACHE_LOOKUPS, FETCH_BYTES, FETCH_ERRORS, POSTS_SCRAPED, StageTimings
+from parsing import DEFAULT_PARSER, PARSERS, anchor_soup, extract_blog_data
+from pipeline import get_parse_pool
+from ratelimit import THROTTLE_STATUSES, AdaptiveHostLimiter, HostRateLimiter, parse_retry_after
+from robots import MAX_ROBOTS_BYTES, RobotsCache
+from textextract import CONTENT_FORMATS, TEXT
+
+# Sitemap URLs kept per host for 'auto' discovery
+MAX_SITEMAP_URLS = int(os.environ.get('MAX_SITEMAP_URLS', 200000))
+
+# Post links per listing page assumed when sizing a Bloom filter for a scrape without max_posts
+BLOOM_POSTS_PER_PAGE = 100
+
+
+class MassMailerScraper:
+    def __init__(self, concurrency=1, requests_per_second=2.0, max_in_flight_per_host=2,
+                 parser=DEFAULT_PARSER, http_cache=None, seen_index=None, stale_after=86400,
+                 session_pool=None, max_pages=1, max_posts=None, use_bloom=False, discovery='html',
+                 parse_pool=None, limits=None, canonicalize=True, dedupe=EXACT, near_distance=3,
+                 archive=None, max_requests_per_second=10.0, adaptive=True, robots=None, throttle_retries=3,
+                 max_attempts=3, retry_delay=1.0, checkpoint=None, content_format=TEXT, max_retry_after=60.0,
+                 max_bloom_capacity=2000000):
+        self.base_url = "https://massmailer.io"
+        self.parser = parser
+        # Post content as plain text with blank lines between paragraphs, or as 'markdown'
+        if content_format not in CONTENT_FORMATS:
+            raise ValueError(f"content_format must be one of {', '.join(CONTENT_FORMATS)}")
+        self.content_format = content_format
+        # Parsed fields cached by the HTTP cache are only reused by scrapers extracting them the same way
+        self.parsed_key = f'{parser}:{content_format}'
+        self.http_cache = http_cache
+        # With a seen_index, posts scraped less than stale_after seconds ago are not refetched
+        self.seen_index = seen_index
+        self.stale_after = stale_after
+        # concurrency=1 fetches one page at a time; anything higher fetches posts on a thread pool
+        self.concurrency = max(1, int(concurrency))
+        # Every request waits its turn with a per-host limiter. The adaptive one starts at
+        # requests_per_second, follows robots.txt Crawl-delay, backs off on 429/503 and
+        # speeds up to max_requests_per_second on fast hosts; robots also blocks disallowed URLs
+        self.robots = robots
+        # Without robots, sitemap discovery still reads robots.txt for Sitemap lines, once per host
+        self.sitemap_robots = robots or RobotsCache(self.polite_get, limits=ROBOTS_LIMITS)
+        if adaptive:
+            self.rate_limiter = AdaptiveHostLimiter(requests_per_second, max_in_flight_per_host,
+                                                    max_requests_per_second, robots)
+        else:
+            self.rate_limiter = HostRateLimiter(requests_per_second, max_in_flight_per_host)
+        self.throttle_retries = throttle_retries
+        # A 429/503 asking to wait longer than max_retry_after seconds fails the URL instead
+        self.max_retry_after = max_retry_after
+        # Pagination is followed for up to max_pages listing pages and max_posts posts
+        self.max_pages = max(1, int(max_pages))
+        self.max_posts = int(max_posts) if max_posts else None
+        # use_bloom keeps seen URLs in a Bloom filter sized from those budgets, holding at most
+        # max_bloom_capacity URLs (about 1.8 bytes each) before false positives rise
+        self.use_bloom = use_bloom
+        self.max_bloom_capacity = max_bloom_capacity
+        # 'auto' tries sitemaps and RSS/Atom feeds before the anchor scan ('html')
+        self.discovery = discovery
+        self.prefilled = {}
+        # Each host's sitemap URLs, read once per crawl and shared by all its listings
+        self.sitemaps = {}
+        self.sitemap_locks = {}
+        self.sitemap_lock = threading.Lock()
+        # Post links are deduplicated on their canonical form but fetched and reported as linked;
+        # fetched posts that repeat an earlier one (by rel=canonical, exact text or, with
+        # dedupe='near', SimHash) are dropped
+        self.canonicalize = canonicalize
+        self.duplicates = DuplicateDetector(dedupe, near_distance)
+        # Optional archive.PostArchive that every scraped post is queued to
+        self.archive = archive
+        # Size, time and content-type caps on downloads; aborts are counted in fetch_stats
+        self.limits = limits or FetchLimits()
+        self.fetch_stats = FetchStats()
+        # Listing and post fetches that fail transiently are tried again once the frontier
+        # drains, up to max_attempts fetches each; fetch_errors holds why the last fetch failed
+        self.retries = RetryQueue(max_attempts, retry_delay)
+        self.fetch_errors = {}
+        # Optional checkpoint.Checkpoint journaling progress so an interrupted scrape can resume
+        self.checkpoint = checkpoint
+        # Time per stage for this scrape; also feeds the /metrics histograms
+        self.timings = StageTimings()
+        # Optional pipeline.ParsePool that moves HTML extraction to worker processes
+        self.parse_pool = parse_pool
+        # Connections are pooled process-wide so keep-alive survives between scrapes
+        self.session_pool = session_pool or get_session_pool()
+        self.session = self.session_pool.session
+
+    def get_page_content(self, url):
+        """Fetch page content with error handling"""
+        return self.fetch_page(url)[0]
+
+    def fetch_page(self, url, html_only=True):
+        """Fetch a page through the HTTP cache, returning (html, cache_status) or (None, None)
+
+        cache_status is FRESH or REVALIDATED when the cached body was used, FETCHED otherwise.
+        The body is streamed under self.limits; html_only rejects non-HTML content types.
+        """
+        cached = self.http_cache.lookup(url) if self.http_cache else None
+        if cached and cached[1]:
+            CACHE_LOOKUPS.inc(result=FRESH)
+            return cached[0], FRESH
+
+        html_content, cache_status = self.download(url, cached, html_only)
+        if self.http_cache and cache_status:
+            CACHE_LOOKUPS.inc(result=cache_status)
+        return html_content, cache_status
+
+    def download(self, url, cached, html_only):
+        """The network half of fetch_page, revalidating cached with its validators"""
+        headers = cached[2] if cached else {}
+        try:
+            response = self.polite_get(url, headers)
+            try:
+                if cached and response.status_code == 304:
+                    self.http_cache.mark_revalidated(url)
+                    return cached[0], REVALIDATED
+                response.raise_for_status()
+                check_headers(response, self.limits, self.limits.allowed_types if html_only else None)
+                body = read_body(response, self.limits)
+            finally:
+                response.close()
+                # From the moment the limiter let the request go, so time spent queued for the host is not counted
+                self.timings.record('fetch', time.perf_counter() - response.fetch_started)
+            text = decode_body(body, response)
+            self.fetch_stats.record_page(len(body))
+            FETCH_BYTES.inc(len(body))
+            if self.http_cache:
+                self.http_cache.store(url, text, response.headers.get('ETag'),
+                                      response.headers.get('Last-Modified'))
+            return text, FETCHED
+        except FetchAborted as e:
+            self.fetch_stats.record_abort(e.reason)
+            FETCH_ERRORS.inc(type=e.reason)
+            print(f"Aborted fetching {url}: {e}")
+            self.fetch_errors[url] = str(e), is_transient(e)
+            return None, None
+        except requests.RequestException as e:
+            self.fetch_stats.record_error()
+            FETCH_ERRORS.inc(type=type(e).__name__)
+            print(f"Error fetching {url}: {e}")
+            self.fetch_errors[url] = str(e), is_transient(e)
+            return None, None
+
+    def extract_blog_links(self, html_content, base_url):
+        """Extract blog post links from category page"""
+        with self.timings.time('extract_links'):
+            return self.blog_links_from_soup(anchor_soup(html_content, self.parser), base_url)
+
+    def blog_links_from_soup(self, soup, base_url):
+        blog_links = []
+
+        # Find all blog post links
+        for link in soup.find_all('a', href=True):
+            href = link.get('href')
+            if href and '/blog/' in href and href != '/blog/':
+                if href.startswith('/'):
+                    href = urljoin(base_url, href)
+                blog_links.append(href)
+
+        # Remove duplicates (keeping page order) and filter valid blog URLs
+        unique_links = list(dict.fromkeys(blog_links))
+        filtered_links = [link for link in unique_links if self.is_valid_blog_url(link)]
+
+        return filtered_links
+
+    def listing_links(self, soup, page_url):
+        """Return (blog_links, pagination_links) from a listing page's anchor soup"""
+        parsed_url = urlparse(page_url)
+        base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
+        pages = find_pagination_links(soup, page_url) if self.max_pages > 1 else []
+        return self.blog_links_from_soup(soup, base_url), pages
+
+    def is_valid_blog_url(self, url):
+        """Check if URL is a valid blog post URL"""
+        parsed = urlparse(url)
+        return ('/blog/' in parsed.path and
+                parsed.path != '/blog/' and
+                not parsed.path.endswith('/blog') and
+                not is_pagination_url(url))
+
+    def scrape_blog_content(self, blog_url):
+        """Scrape individual blog post content"""
+        # Posts whose full content came with the feed need no request
+        blog_data = self.prefilled.pop(self.post_key(blog_url), None)
+        if blog_data:
+            return self.unless_duplicate(blog_data)
+
+        html_content, cache_status = self.fetch_page(blog_url)
+        if not html_content:
+            self.fetch_failed(blog_url, POST)
+            return None
+        self.retries.succeeded(blog_url)
+
+        # An unchanged page reuses the fields parsed last time
+        if cache_status in (FRESH, REVALIDATED):
+            blog_data = self.http_cache.get_parsed(blog_url, self.parsed_key)
+
+        if not blog_data:
+            with self.timings.time('parse'):
+                if self.parse_pool:
+                    blog_data = self.parse_pool.parse(html_content, blog_url, self.parser, self.content_format)
+                else:
+                    blog_data = extract_blog_data(html_content, blog_url, self.parser, self.content_format)
+            POSTS_SCRAPED.inc()
+            if self.http_cache:
+                self.http_cache.store_parsed(blog_url, self.parsed_key, blog_data)
+        return self.unless_duplicate(blog_data, html_content)
+
+    def unless_duplicate(self, blog_data, html_content=None):
+        """blog_data, or None if it repeats a post already scraped by this scraper"""
+        if self.duplicates.mode == 'off':
+            return blog_data
+        canonical = canonical_link(html_content, blog_data['url']) if html_content else None
+        duplicate = self.duplicates.check(blog_data['url'], blog_data['content'],
+                                          url_key(canonical or blog_data['url']))
+        return None if duplicate else blog_data
+
+    def fetch_failed(self, url, kind):
+        """Queue a failed fetch for another try, or give up on it after max_attempts"""
+        error, transient = self.fetch_errors.pop(url, ('empty response', False))
+        retry = self.retries.failed(url, kind, error, transient)
+        if self.checkpoint:
+            self.checkpoint.failed(url, self.retries.attempts[url], error)
+        return retry
+
+    def requeue_failed(self, frontier):
+        """Put failed URLs due another try back on the frontier after a backoff; False if there are none"""
+        due = self.retries.take()
+        for url, kind in due:
+            if kind == PAGE:
+                frontier.pages.append(url)
+            else:
+                frontier.posts.append(url)
+        return bool(due)
+
+    def fetch_listing(self, page_url):
+        html_content = self.get_page_content(page_url)
+        if html_content:
+            self.retries.succeeded(page_url)
+        else:
+            self.fetch_failed(page_url, PAGE)
+        return page_url, html_content
+
+    def expand_frontier(self, frontier, page_url, html_content, plan=None, discover=False):
+        """Queue the posts and further listing pages found on a listing page
+
+        With discover set (the first page in 'auto' discovery mode), sitemap
+        links below the listing replace the anchor scan and pagination, and
+        feed entries add their posts, prefilled when the feed carries content.
+        """
+        if not html_content:
+            return
+        with self.timings.time('extract_links'):
+            soup = anchor_soup(html_content, self.parser)
+            blog_links, pages = self.listing_links(soup, page_url)
+        if discover:
+            sitemap_links = self.sitemap_links(page_url, frontier.for_page(page_url).max_posts)
+            if sitemap_links:
+                blog_links, pages = sitemap_links, []
+            blog_links = list(dict.fromkeys(blog_links + self.feed_links(soup, page_url)))
+        if self.checkpoint:
+            self.checkpoint.listing(page_url, blog_links, pages)
+        self.queue_links(frontier, page_url, blog_links, pages, plan)
+
+    def queue_links(self, frontier, page_url, blog_links, pages, plan=None):
+        """Add the post and pagination links read from a listing page to the frontier"""
+        frontier = frontier.for_page(page_url)
+        new_links = [link for link in blog_links if frontier.add_post(link)]
+        if plan:
+            plan.extend(new_links)
+        if not frontier.post_budget_spent():
+            for page in pages:
+                frontier.add_page(page)
+
+    def polite_get(self, url, headers=None):
+        """Streamed GET through the host's limiter, retrying 429/503 after backing off
+
+        Time waiting for the limiter is recorded as the 'rate_limit' stage, and
+        response.fetch_started is when the returned request was sent.
+        Raises FetchAborted for URLs robots.txt disallows and for hosts asking to
+        retry after more than max_retry_after seconds.
+        """
+        if self.robots and not self.robots.allowed(url):
+            raise FetchAborted(DISALLOWED, 'disallowed by robots.txt')
+        for attempt in range(self.throttle_retries + 1):
+            queued = time.perf_counter()
+            with self.rate_limiter.limit(url):
+                started = time.perf_counter()
+                self.timings.record('rate_limit', started - queued)
+                response = self.session.get(url, timeout=10, headers=headers, stream=True)
+                latency = time.perf_counter() - started
+            response.fetch_started = started
+            if response.status_code not in THROTTLE_STATUSES:
+                self.rate_limiter.record(url, status=response.status_code, latency=latency)
+                return response
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            self.rate_limiter.record(url, status=response.status_code, retry_after=retry_after)
+            if retry_after is not None and retry_after > self.max_retry_after:
+                response.close()
+                raise FetchAborted(THROTTLED, f'Retry-After of {retry_after:.0f}s is over the '
+                                              f'{self.max_retry_after:.0f}s limit')
+            if attempt == self.throttle_retries:
+                return response
+            response.close()
+
+    @contextmanager
+    def open_stream(self, url):
+        """Open a streamed GET for url and yield its decompressed body as a binary file
+
+        Feeds and sitemaps are held to self.limits like pages: reading more than
+        max_bytes, before or after gunzipping a .gz file, or past the deadline
+        raises FetchAborted, which is counted in fetch_stats.
+        """
+        try:
+            response = self.polite_get(url)
+            try:
+                response.raise_for_status()
+                check_headers(response, self.limits, None)
+                response.raw.decode_content = True
+                with download_deadline(response, self.limits):
+                    body = stream = LimitedReader(response.raw, self.limits.max_bytes, self.limits.chunk_size)
+                    if urlparse(url).path.endswith('.gz'):
+                        stream = LimitedReader(gzip.GzipFile(fileobj=body), self.limits.max_bytes,
+                                               self.limits.chunk_size)
+                    yield stream
+            finally:
+                response.close()
+        except FetchAborted as e:
+            self.fetch_stats.record_abort(e.reason)
+            FETCH_ERRORS.inc(type=e.reason)
+            raise
+        self.fetch_stats.record_page(body.size)
+        FETCH_BYTES.inc(body.size)
+
+    def feed_links(self, soup, page_url):
+        """Post URLs from the listing's RSS/Atom feed; entries with full content are prefilled"""
+        links = []
+        host = urlparse(page_url).netloc
+        for feed_url in feed_links_from_soup(soup, page_url) or [guess_feed_url(page_url)]:
+            try:
+                with self.open_stream(feed_url) as stream:
+                    entries = parse_feed(stream.read(), feed_url, self.parser, self.content_format)
+            except (requests.RequestException, etree.LxmlError, FetchAborted) as e:
+                print(f"No feed at {feed_url}: {e}")
+                continue
+            for blog_data, has_content in entries:
+                if urlparse(blog_data['url']).netloc != host:
+                    continue
+                links.append(blog_data['url'])
+                if has_content:
+                    self.prefilled[self.post_key(blog_data['url'])] = blog_data
+        return links
+
+    def sitemap_links(self, page_url, limit=None):
+        """Post URLs below the listing's path from the site's sitemaps"""
+        links = [url for url in self.host_sitemap_urls(page_url) if in_listing_scope(url, page_url)]
+        return links[:limit] if limit else links
+
+    def host_sitemap_urls(self, page_url):
+        """The non-pagination URLs in the sitemaps of page_url's host, fetched once per crawl
+
+        At most MAX_SITEMAP_URLS are kept per host.
+        """
+        host = urlparse(page_url).netloc
+        with self.sitemap_lock:
+            if host in self.sitemaps:
+                return self.sitemaps[host]
+            host_lock = self.sitemap_locks.setdefault(host, threading.Lock())
+        # Listings on the same host wait for one read instead of each fetching the sitemaps
+        with host_lock:
+            with self.sitemap_lock:
+                if host in self.sitemaps:
+                    return self.sitemaps[host]
+            robots = self.sitemap_robots.text(page_url)
+            sitemap_urls = (sitemaps_from_robots(robots) if robots else []) or default_sitemap_urls(page_url)
+            urls = []
+            for url in iter_sitemap_urls(self.open_stream, sitemap_urls):
+                if urlparse(url).netloc == host and not is_pagination_url(url):
+                    urls.append(url)
+                    if len(urls) >= MAX_SITEMAP_URLS:
+                        break
+            with self.sitemap_lock:
+                self.sitemaps[host] = urls
+            return urls
+
+    def post_key(self, url):
+        """What a post URL is deduplicated on: its canonical form, or the URL itself with canonicalize off"""
+        return url_key(url) if self.canonicalize else url
+
+    def new_seen_set(self, roots=1):
+        if not self.use_bloom:
+            return HashedUrlSet()
+        # Each listing URL adds at most max_pages pages and max_posts posts to the seen set
+        posts = self.max_posts or self.max_pages * BLOOM_POSTS_PER_PAGE
+        return BloomFilter(min((self.max_pages + posts) * roots, self.max_bloom_capacity))
+
+    def new_frontier(self):
+        return Frontier(self.max_pages, self.max_posts, self.new_seen_set(), self.post_key)
+
+    def iter_blogs(self, category_url):
+        """Scrape all blogs from given URL, yielding (done, total, blog_data) as each post finishes
+
+        The first item is (0, total, None) once the first listing page is parsed;
+        blog_data is None for posts that could not be fetched. When following
+        pagination (max_pages > 1), total grows as more listing pages are read.
+        """
+        frontier = self.new_frontier()
+        frontier.add_page(category_url)
+        self.sitemaps = {}
+
+        scrape = self.scrape_blog_content
+        plan = None
+        if self.seen_index:
+            plan = IncrementalPlan(self.seen_index, category_url, [], self.stale_after)
+            scrape = partial(self.scrape_incremental, plan)
+        if self.checkpoint:
+            self.resume(frontier, [category_url], plan)
+        yield from self.crawl(frontier, scrape, plan)
+
+    def iter_batch(self, category_urls):
+        """Scrape several listing URLs as one crawl, yielding (done, total, blog_data) like iter_blogs
+
+        Returns the BatchFrontier when exhausted (see scrape_batch) so posts can be
+        attributed to every listing that links them.
+        """
+        frontier = BatchFrontier(self.max_pages, self.max_posts, self.new_seen_set(len(category_urls)),
+                                 self.post_key)
+        for category_url in category_urls:
+            frontier.add_root(category_url)
+        self.sitemaps = {}
+        if self.checkpoint:
+            self.resume(frontier, category_urls)
+        yield from self.crawl(frontier, self.scrape_blog_content)
+        return frontier
+
+    def resume(self, frontier, roots, plan=None):
+        """Open the checkpoint and replay what it recorded into a fresh frontier
+
+        Listing pages already read are not fetched again, and finished posts
+        come back from the journal instead of the network (see scrape_checkpointed).
+        """
+        checkpoint = self.checkpoint.open(roots)
+        for page_url, blog_links, pages in checkpoint.listings:
+            self.queue_links(frontier, page_url, blog_links, pages, plan)
+        for url, (attempts, error) in checkpoint.failures.items():
+            self.retries.seed(url, attempts, error)
+        for url, blog_data in checkpoint.rows.items():
+            if blog_data:
+                self.duplicates.check(url, blog_data['content'], url_key(url))
+        listed = {page_url for page_url, _, _ in checkpoint.listings}
+        frontier.pages = deque(url for url in frontier.pages
+                               if url not in listed and not self.retries.exhausted(url))
+
+    def scrape_checkpointed(self, scrape, blog_url):
+        """The journaled row of a post the checkpoint has finished, else scrape() it and journal the row
+
+        A post that used up its attempts before the interruption is journaled as
+        failed without being fetched again, as resume() does for listing pages.
+        """
+        if blog_url in self.checkpoint.rows:
+            return self.checkpoint.rows.pop(blog_url)
+        if self.retries.exhausted(blog_url):
+            self.checkpoint.post(blog_url, None)
+            return None
+        blog_data = scrape(blog_url)
+        if not self.retries.is_pending(blog_url):
+            self.checkpoint.post(blog_url, blog_data)
+        return blog_data
+
+    def crawl(self, frontier, scrape, plan=None):
+        """Work through a frontier's listing pages and posts, yielding (done, total, blog_data)
+
+        Posts whose fetch will be retried are yielded once their last attempt finishes.
+        """
+        if self.checkpoint:
+            scrape = partial(self.scrape_checkpointed, scrape)
+        if self.concurrency > 1:
+            results = self.crawl_concurrent(frontier, scrape, plan)
+        else:
+            results = self.crawl_sequential(frontier, scrape, plan)
+        try:
+            for done, total, blog_data in results:
+                if blog_data and self.archive:
+                    self.archive.add(blog_data, next(iter(frontier.sources_of(blog_data['url'])), None))
+                yield done, total, blog_data
+        finally:
+            if self.checkpoint:
+                self.checkpoint.close()
+
+    def crawl_sequential(self, frontier, scrape, plan=None):
+        """Fetch listing pages and then their posts one at a time, then retry what failed"""
+        discover = self.discovery == 'auto'
+        done = 0
+        started = False
+        while frontier.pages or frontier.posts or self.requeue_failed(frontier):
+            html_content = None
+            if frontier.pages:
+                # Get listing page content
+                page_url, html_content = self.fetch_listing(frontier.pages.popleft())
+                self.expand_frontier(frontier, page_url, html_content, plan,
+                                     discover=discover and frontier.is_root(page_url))
+            if not started and (html_content or frontier.posts):
+                started = True
+                yield 0, frontier.posts_queued, None
+
+            # Scrape each blog; the rate limiter spaces out the requests
+            while frontier.posts:
+                blog_url = frontier.posts.popleft()
+                blog_data = scrape(blog_url)
+                if blog_data is None and self.retries.is_pending(blog_url):
+                    continue
+                done += 1
+                yield done, frontier.posts_queued, blog_data
+
+    def crawl_concurrent(self, frontier, scrape, plan=None):
+        """Fetch listing and post pages on one thread pool, yielding posts in discovery order
+
+        Listing pages are fetched as soon as they are found, alongside posts.
+        At most 2 * concurrency posts are queued ahead of the consumer, so
+        memory stays flat however large the crawl is. Failed fetches are
+        retried once everything else is done.
+        """
+        window = self.concurrency * 2
+        listings = deque()
+        posts = deque()
+        done = 0
+        started = False
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            try:
+                while True:
+                    while frontier.pages:
+                        listings.append(executor.submit(self.fetch_listing, frontier.pages.popleft()))
+                    while frontier.posts and len(posts) < window:
+                        blog_url = frontier.posts.popleft()
+                        posts.append((blog_url, executor.submit(scrape, blog_url)))
+                    if not listings and not posts:
+                        if self.requeue_failed(frontier):
+                            continue
+                        return
+
+                    # Listing pages are expanded in the order they were found so
+                    # post order does not depend on network timing
+                    if listings and (not posts or listings[0].done()):
+                        page_url, html_content = listings.popleft().result()
+                        self.expand_frontier(frontier, page_url, html_content, plan,
+                                             discover=self.discovery == 'auto' and frontier.is_root(page_url))
+                        if not started and (html_content or frontier.posts):
+                            started = True
+                            yield 0, frontier.posts_queued, None
+                        continue
+
+                    blog_url, future = posts.popleft()
+                    blog_data = future.result()
+                    if blog_data is None and self.retries.is_pending(blog_url):
+                        continue
+                    done += 1
+                    yield done, frontier.posts_queued, blog_data
+            finally:
+                # Stop queued work if the consumer goes away early
+                for future in [*listings, *(future for _, future in posts)]:
+                    future.cancel()
+
+    def scrape_incremental(self, plan, blog_url):
+        """Scrape a post only if it is new or stale, labelling it added, updated or unchanged"""
+        if not plan.needs_fetch(blog_url):
+            return plan.cached(blog_url)
+        blog_data = self.scrape_blog_content(blog_url)
+        return plan.label(blog_data) if blog_data else None
+
+    def scrape_all_blogs(self, category_url, on_progress=None):
+        """Main function to scrape all blogs from given URL
+
+        on_progress, if given, is called as on_progress(done, total) after each post.
+        """
+        blogs_data = []
+        with self.timings.time('scrape'):
+            for done, total, blog_data in self.iter_blogs(category_url):
+                if blog_data:
+                    blogs_data.append(blog_data)
+                if on_progress:
+                    on_progress(done, total)
+        return blogs_data
+
+    def scrape_batch(self, category_urls, on_progress=None):
+        """Scrape several listing URLs together, returning (blogs, per-listing stats)
+
+        Each post carries a 'sources' list of the listing URLs that link it.
+        """
+        blogs_data = []
+        batch = self.iter_batch(category_urls)
+        with self.timings.time('scrape'):
+            while True:
+                try:
+                    done, total, blog_data = next(batch)
+                except StopIteration as stop:
+                    frontier = stop.value
+                    break
+                if blog_data:
+                    blogs_data.append(blog_data)
+                if on_progress:
+                    on_progress(done, total)
+
+        sources = {url: {'pages': source.pages_queued, 'posts': 0} for url, source in frontier.sources.items()}
+        for blog_data in blogs_data:
+            blog_data['sources'] = frontier.sources_of(blog_data['url'])
+            for source in blog_data['sources']:
+                sources[source]['posts'] += 1
+        return blogs_data, sources
+
+
+# Persistent page cache shared by all scrapes; enabled by setting HTTP_CACHE_PATH
+http_cache = None
+if os.environ.get('HTTP_CACHE_PATH'):
+    http_cache = HttpCache(
+        os.environ['HTTP_CACHE_PATH'],
+        ttl=int(os.environ.get('HTTP_CACHE_TTL', 3600)),
+        max_bytes=int(os.environ.get('HTTP_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+    )
+
+# Searchable archive of every scraped post; enabled by setting POST_ARCHIVE_PATH, opened on first use
+post_archive = None
+post_archive_lock = threading.Lock()
+
+
+def get_post_archive():
+    """The shared PostArchive, or None when POST_ARCHIVE_PATH is not set"""
+    global post_archive
+    if not os.environ.get('POST_ARCHIVE_PATH'):
+        return None
+    with post_archive_lock:
+        if post_archive is None:
+            post_archive = PostArchive(
+                os.environ['POST_ARCHIVE_PATH'],
+                batch_size=int(os.environ.get('POST_ARCHIVE_BATCH', 200))
+            )
+        return post_archive
+
+
+# Size and time caps on robots.txt downloads
+ROBOTS_LIMITS = FetchLimits(
+    max_bytes=int(os.environ.get('ROBOTS_MAX_BYTES', MAX_ROBOTS_BYTES)),
+    deadline=float(os.environ.get('ROBOTS_DEADLINE', 30)),
+    allowed_types=None
+)
+
+# robots.txt rules per host, shared by all scrapes
+robots_cache = RobotsCache(
+    lambda url: get_session_pool().session.get(url, timeout=10, stream=True),
+    user_agent=os.environ.get('ROBOTS_USER_AGENT', '*'),
+    ttl=int(os.environ.get('ROBOTS_TTL', 86400)),
+    limits=ROBOTS_LIMITS
+)
+
+# Index of previously scraped posts for incremental scrapes, opened on first use
+seen_index = None
+seen_index_lock = threading.Lock()
+
+
+def get_seen_index():
+    global seen_index
+    with seen_index_lock:
+        if seen_index is None:
+            seen_index = SeenIndex(os.environ.get('SEEN_INDEX_PATH', 'scrape_index.sqlite'))
+        return seen_index
+
+
+# Default download caps, overridable per scrape with max_page_bytes and page_deadline
+MAX_PAGE_BYTES = int(os.environ.get('MAX_PAGE_BYTES', 5 * 1024 * 1024))
+PAGE_DEADLINE = float(os.environ.get('PAGE_DEADLINE', 30))
+MAX_RETRY_AFTER = float(os.environ.get('MAX_RETRY_AFTER', 60))
+# Most URLs a use_bloom scrape's Bloom filter is sized for; 2M URLs take about 3.6 MB
+MAX_BLOOM_CAPACITY = int(os.environ.get('MAX_BLOOM_CAPACITY', 2000000))
+
+TRUE_STRINGS = frozenset(['1', 'true', 'yes', 'on'])
+FALSE_STRINGS = frozenset(['0', 'false', 'no', 'off'])
+
+# Scrape options that are switches, with their defaults
+FLAG_OPTIONS = {
+    'adaptive': True,
+    'respect_robots': True,
+    'incremental': False,
+    'use_bloom': False,
+    'canonicalize': True,
+    'archive': True,
+}
+# Numeric scrape options: (type, default, minimum, maximum); None for no default or no bound
+NUMBER_OPTIONS = {
+    'concurrency': (int, 1, 1, None),
+    'max_pages': (int, 1, 1, None),
+    'max_posts': (int, None, 1, None),
+    'max_in_flight_per_host': (int, 2, 1, None),
+    'near_distance': (int, 3, 0, 64),
+    'max_attempts': (int, 3, 1, None),
+    'max_page_bytes': (int, MAX_PAGE_BYTES, 1, None),
+    'requests_per_second': (float, 2.0, 0.001, None),
+    'max_requests_per_second': (float, 10.0, 0.001, None),
+    'stale_after': (float, 86400.0, 0, None),
+    'page_deadline': (float, PAGE_DEADLINE, 0.001, None),
+    'retry_delay': (float, 1.0, 0, None),
+}
+# Scrape options with a fixed set of values: (values, default)
+CHOICE_OPTIONS = {
+    'parser': (PARSERS, DEFAULT_PARSER),
+    'discovery': (DISCOVERY_MODES, HTML),
+    'dedupe': (DEDUPE_MODES, EXACT),
+    'content_format': (CONTENT_FORMATS, TEXT),
+}
+
+
+def parse_flag(name, value):
+    """A switch from JSON (true/false) or a query string (1/true/yes/on, 0/false/no/off)"""
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_STRINGS:
+        return True
+    if text in FALSE_STRINGS:
+        return False
+    raise ValueError(f'{name} must be true or false')
+
+
+def parse_number(name, value, cast=int, minimum=None, maximum=None):
+    """A number from JSON or a query string, raising ValueError below minimum; capped at maximum"""
+    try:
+        number = None if isinstance(value, bool) else cast(value)
+    except (TypeError, ValueError, OverflowError):
+        number = None
+    if number is None or not math.isfinite(number):
+        raise ValueError(f'{name} must be {"an integer" if cast is int else "a number"}')
+    if minimum is not None and number < minimum:
+        raise ValueError(f'{name} must be at least {minimum}')
+    return min(number, maximum) if maximum is not None else number
+
+
+def parse_options(options, caps=None):
+    """Scrape options from a JSON body or query string with switches, numbers and choices typed and checked
+
+    Missing, null and empty values take their defaults. Raises ValueError
+    naming the first bad option; other options are passed through as given.
+    caps maps numeric options to the largest value allowed, lowering larger ones.
+    """
+    parsed = dict(options)
+    for name, default in FLAG_OPTIONS.items():
+        value = options.get(name)
+        parsed[name] = default if value is None or value == '' else parse_flag(name, value)
+    for name, (cast, default, minimum, maximum) in NUMBER_OPTIONS.items():
+        maximum = (caps or {}).get(name, maximum)
+        value = options.get(name)
+        parsed[name] = default if value is None or value == '' else parse_number(name, value, cast, minimum,
+                                                                                 maximum)
+    for name, (values, default) in CHOICE_OPTIONS.items():
+        value = options.get(name)
+        if value is None or value == '':
+            parsed[name] = default
+        elif value in values:
+            parsed[name] = value
+        else:
+            raise ValueError(f"{name} must be one of {', '.join(values)}")
+    return parsed
+
+
+def build_scraper(options, checkpoint=None):
+    """Create a scraper from the options posted by the client; raises ValueError for bad options"""
+    options = parse_options(options)
+    return MassMailerScraper(
+        concurrency=options['concurrency'],
+        requests_per_second=options['requests_per_second'],
+        max_requests_per_second=options['max_requests_per_second'],
+        adaptive=options['adaptive'],
+        robots=robots_cache if options['respect_robots'] else None,
+        max_in_flight_per_host=options['max_in_flight_per_host'],
+        parser=options['parser'],
+        http_cache=http_cache,
+        seen_index=get_seen_index() if options['incremental'] else None,
+        stale_after=options['stale_after'],
+        max_pages=options['max_pages'],
+        max_posts=options['max_posts'],
+        use_bloom=options['use_bloom'],
+        discovery=options['discovery'],
+        parse_pool=get_parse_pool(),
+        limits=FetchLimits(
+            max_bytes=options['max_page_bytes'],
+            deadline=options['page_deadline']
+        ),
+        canonicalize=options['canonicalize'],
+        dedupe=options['dedupe'],
+        near_distance=options['near_distance'],
+        archive=get_post_archive() if options['archive'] else None,
+        max_attempts=options['max_attempts'],
+        retry_delay=options['retry_delay'],
+        checkpoint=checkpoint,
+        content_format=options['content_format'],
+        max_retry_after=MAX_RETRY_AFTER,
+        max_bloom_capacity=MAX_BLOOM_CAPACITY
+    )
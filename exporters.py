@@ -0,0 +1,125 @@
+import csv
+import io
+import json
+
+from parsing import BLOG_FIELDS
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+class ExportError(Exception):
+    """Raised when an export format cannot be produced"""
+
+
+def iter_csv(rows, fieldnames=BLOG_FIELDS, batch_rows=200):
+    """Yield a CSV file as UTF-8 byte chunks of about batch_rows rows"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
+    writer.writeheader()
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= batch_rows:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_ndjson(rows, batch_rows=200):
+    """Yield one JSON object per line, batched into byte chunks"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row, ensure_ascii=False))
+        if len(lines) >= batch_rows:
+            yield ('\n'.join(lines) + '\n').encode('utf-8')
+            lines = []
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to the caller in chunks"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_parquet(rows, fieldnames=BLOG_FIELDS, batch_rows=1000):
+    """Yield a Parquet file as byte chunks, one row group per batch_rows rows
+
+    Needs the optional pyarrow package.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError('Parquet export requires pyarrow (pip install pyarrow)')
+
+    schema = pa.schema([(field, pa.string()) for field in fieldnames])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema, compression='zstd')
+
+    def write_batch(batch):
+        columns = {field: [str(row.get(field, '')) for row in batch] for field in fieldnames}
+        writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_rows:
+            write_batch(batch)
+            batch = []
+            yield sink.drain()
+    if batch:
+        write_batch(batch)
+    writer.close()
+    yield sink.drain()
+
+
+def iter_export(rows, fmt):
+    """Byte chunks of rows in the given export format"""
+    if fmt == 'csv':
+        return iter_csv(rows)
+    if fmt == 'ndjson':
+        return iter_ndjson(rows)
+    if fmt == 'parquet':
+        # Run the generator up to its first yield so a missing pyarrow fails
+        # before the response starts
+        chunks = iter_parquet(rows)
+        first = next(chunks)
+        return _prepend(first, chunks)
+    raise ExportError(f"Unknown export format: {fmt}")
+
+
+def _prepend(first, chunks):
+    yield first
+    yield from chunks
@@ -0,0 +1,197 @@
+import re
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+
+import requests
+
+HTML_TYPES = ('text/html', 'application/xhtml+xml')
+
+CHARSET_HEADER_RE = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.I)
+CHARSET_META_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w.:-]+)', re.I)
+
+TOO_LARGE = 'too_large'
+DEADLINE = 'deadline'
+CONTENT_TYPE = 'content_type'
+DISALLOWED = 'robots'
+THROTTLED = 'throttled'
+
+# HTTP errors worth retrying; other 4xx responses will not change
+TRANSIENT_STATUSES = (408, 425, 429, 500, 502, 503, 504)
+
+
+class FetchAborted(Exception):
+    """A download was stopped because it broke one of the FetchLimits or robots.txt"""
+
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+
+
+class FetchLimits:
+    """Caps applied to every page download"""
+
+    def __init__(self, max_bytes=5 * 1024 * 1024, deadline=30, allowed_types=HTML_TYPES, chunk_size=64 * 1024):
+        self.max_bytes = max_bytes
+        self.deadline = deadline
+        self.allowed_types = allowed_types
+        self.chunk_size = chunk_size
+
+
+class FetchStats:
+    """Per-scrape download counters, safe to update from fetch threads"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pages = 0
+        self.bytes = 0
+        self.aborts = {}
+        self.errors = 0
+
+    def record_page(self, size):
+        with self.lock:
+            self.pages += 1
+            self.bytes += size
+
+    def record_abort(self, reason):
+        with self.lock:
+            self.aborts[reason] = self.aborts.get(reason, 0) + 1
+
+    def record_error(self):
+        with self.lock:
+            self.errors += 1
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'pages': self.pages,
+                'bytes': self.bytes,
+                'aborts': dict(self.aborts),
+                'errors': self.errors
+            }
+
+
+def is_transient(error):
+    """True if a fetch that failed with error may succeed when tried again"""
+    if isinstance(error, FetchAborted):
+        return error.reason == DEADLINE
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code in TRANSIENT_STATUSES
+    return isinstance(error, requests.RequestException)
+
+
+def check_headers(response, limits, allowed_types):
+    """Reject a response from its headers before any of the body is read"""
+    content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+    if allowed_types and content_type and content_type not in allowed_types:
+        raise FetchAborted(CONTENT_TYPE, f"content type {content_type} is not HTML")
+    length = response.headers.get('Content-Length')
+    if length and length.isdigit() and int(length) > limits.max_bytes:
+        raise FetchAborted(TOO_LARGE, f"Content-Length {length} exceeds {limits.max_bytes} bytes")
+
+
+@contextmanager
+def download_deadline(response, limits):
+    """Raise FetchAborted if reading the response inside the block outlasts limits.deadline
+
+    A timer closes the connection when the deadline passes, so a server that
+    drips bytes slower than the read timeout cannot hold the thread.
+    """
+    expired = threading.Event()
+
+    def expire():
+        expired.set()
+        _shutdown_socket(response)
+
+    timer = threading.Timer(limits.deadline, expire)
+    timer.daemon = True
+    started = time.monotonic()
+    timer.start()
+    try:
+        yield
+    except FetchAborted:
+        raise
+    except Exception:
+        if expired.is_set():
+            raise FetchAborted(DEADLINE, f"download took longer than {limits.deadline}s")
+        raise
+    finally:
+        timer.cancel()
+    if expired.is_set() or time.monotonic() - started > limits.deadline:
+        raise FetchAborted(DEADLINE, f"download took longer than {limits.deadline}s")
+
+
+def read_body(response, limits):
+    """Read a streamed response body, enforcing the size cap and total deadline"""
+    chunks = []
+    size = 0
+    with download_deadline(response, limits):
+        for chunk in response.iter_content(limits.chunk_size):
+            size += len(chunk)
+            if size > limits.max_bytes:
+                response.close()
+                raise FetchAborted(TOO_LARGE, f"body exceeds {limits.max_bytes} bytes")
+            chunks.append(chunk)
+    return b''.join(chunks)
+
+
+class LimitedReader:
+    """Binary file wrapper that raises FetchAborted once more than max_bytes have been read
+
+    Wrapping a GzipFile caps the decompressed size, so a small gzip bomb
+    cannot expand without limit.
+    """
+
+    def __init__(self, stream, max_bytes, chunk_size=64 * 1024):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.size = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            # Read in chunks so the cap applies before everything is in memory
+            return b''.join(iter(partial(self.read, self.chunk_size), b''))
+        data = self.stream.read(size)
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise FetchAborted(TOO_LARGE, f"body exceeds {self.max_bytes} bytes")
+        return data
+
+
+def _shutdown_socket(response):
+    """Unblock a thread stuck in recv() on this response's connection
+
+    close() from another thread does not interrupt a blocking read;
+    shutdown() does.
+    """
+    sock = getattr(getattr(response.raw, '_connection', None), 'sock', None)
+    if sock is None:
+        # http.client drops connection.sock for responses that end with the
+        # connection; the socket is still reachable through the body's file
+        body_file = getattr(getattr(response.raw, '_fp', None), 'fp', None)
+        sock = getattr(getattr(body_file, 'raw', None), '_sock', None)
+    try:
+        if sock is not None:
+            sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+    response.close()
+
+
+def decode_body(body, response):
+    """Decode using the header charset, then a <meta charset> in the first 4 KB, then UTF-8
+
+    Skips requests' apparent_encoding detection, which scans the whole body.
+    """
+    match = CHARSET_HEADER_RE.search(response.headers.get('Content-Type', ''))
+    encoding = match.group(1) if match else None
+    if not encoding:
+        meta = CHARSET_META_RE.search(body[:4096])
+        encoding = meta.group(1).decode('ascii', 'ignore') if meta else 'utf-8'
+    try:
+        return body.decode(encoding, errors='replace')
+    except LookupError:
+        return body.decode('utf-8', errors='replace')
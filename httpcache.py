@@ -0,0 +1,141 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+FRESH = 'fresh'
+REVALIDATED = 'revalidated'
+FETCHED = 'fetched'
+
+
+class HttpCache:
+    """Persistent page cache in SQLite with ETag/Last-Modified validators
+
+    Bodies younger than ttl seconds are served without a request; older ones
+    are revalidated with a conditional GET. The parsed blog fields are cached
+    next to the body so an unchanged page is not parsed again either.
+    Compressed bodies are kept under max_bytes by evicting the least
+    recently used entries.
+    """
+
+    def __init__(self, path, ttl=3600, max_bytes=512 * 1024 * 1024, evict_every=50):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.evict_every = evict_every
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.counters = dict.fromkeys(['hits', 'revalidated', 'misses', 'evictions'], 0)
+        self.stores_since_evict = 0
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body BLOB,
+                size INTEGER,
+                fetched_at REAL,
+                accessed_at REAL,
+                parsed_key TEXT,
+                parsed TEXT
+            )
+        """)
+        conn.execute('CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at)')
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self.local.conn = conn
+        return conn
+
+    def _count(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def lookup(self, url):
+        """Return (body, is_fresh, validators) for a cached URL, or None"""
+        conn = self._conn()
+        row = conn.execute('SELECT etag, last_modified, body, fetched_at FROM pages WHERE url = ?',
+                           (url,)).fetchone()
+        if not row:
+            return None
+        etag, last_modified, body, fetched_at = row
+        conn.execute('UPDATE pages SET accessed_at = ? WHERE url = ?', (time.time(), url))
+        conn.commit()
+        is_fresh = time.time() - fetched_at < self.ttl
+        if is_fresh:
+            self._count('hits')
+        validators = {}
+        if etag:
+            validators['If-None-Match'] = etag
+        if last_modified:
+            validators['If-Modified-Since'] = last_modified
+        return zlib.decompress(body).decode('utf-8'), is_fresh, validators
+
+    def mark_revalidated(self, url):
+        """Record a 304 response: the cached body is current again"""
+        self._count('revalidated')
+        conn = self._conn()
+        conn.execute('UPDATE pages SET fetched_at = ? WHERE url = ?', (time.time(), url))
+        conn.commit()
+
+    def store(self, url, body, etag=None, last_modified=None):
+        """Cache a freshly downloaded body, dropping any parsed fields for the old one"""
+        compressed = zlib.compress(body.encode('utf-8'), 6)
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            'INSERT OR REPLACE INTO pages (url, etag, last_modified, body, size, fetched_at, accessed_at, '
+            'parsed_key, parsed) VALUES (?, ?, ?, ?, ?, ?, ?, NULL, NULL)',
+            (url, etag, last_modified, compressed, len(compressed), now, now)
+        )
+        conn.commit()
+        # Every store follows a full download, so it doubles as the miss count
+        self._count('misses')
+        with self.lock:
+            self.stores_since_evict += 1
+            due = self.stores_since_evict >= self.evict_every
+            if due:
+                self.stores_since_evict = 0
+        if due:
+            self.evict()
+
+    def get_parsed(self, url, key):
+        row = self._conn().execute('SELECT parsed FROM pages WHERE url = ? AND parsed_key = ?',
+                                   (url, key)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def store_parsed(self, url, key, data):
+        conn = self._conn()
+        conn.execute('UPDATE pages SET parsed_key = ?, parsed = ? WHERE url = ?', (key, json.dumps(data), url))
+        conn.commit()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        conn = self._conn()
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        evicted = 0
+        for url, size in conn.execute('SELECT url, size FROM pages ORDER BY accessed_at').fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute('DELETE FROM pages WHERE url = ?', (url,))
+            total -= size
+            evicted += 1
+        conn.commit()
+        with self.lock:
+            self.counters['evictions'] += evicted
+        return evicted
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+        lookups = stats['hits'] + stats['revalidated'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits'] + stats['revalidated']) / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from parsing import BLOG_FIELDS
+
+ADDED = 'added'
+UNCHANGED = 'unchanged'
+UPDATED = 'updated'
+
+
+def content_hash(blog_data):
+    """Stable hash of a post's scraped fields, ignoring the URL"""
+    fields = {field: blog_data.get(field, '') for field in BLOG_FIELDS if field != 'url'}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class SeenIndex:
+    """Per-category index of previously scraped posts for incremental re-scrapes"""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS seen_posts (
+                category_url TEXT NOT NULL,
+                post_url TEXT NOT NULL,
+                content_hash TEXT,
+                first_seen REAL,
+                last_scraped REAL,
+                data TEXT,
+                PRIMARY KEY (category_url, post_url)
+            )
+        """)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self.local.conn = conn
+        return conn
+
+    def lookup(self, category_url, post_urls):
+        """Return {post_url: record} for the given posts already in the index"""
+        records = {}
+        post_urls = list(post_urls)
+        conn = self._conn()
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(post_urls), 500):
+            chunk = post_urls[start:start + 500]
+            rows = conn.execute(
+                f"SELECT post_url, content_hash, first_seen, last_scraped, data FROM seen_posts "
+                f"WHERE category_url = ? AND post_url IN ({', '.join('?' * len(chunk))})",
+                [category_url, *chunk]
+            )
+            for post_url, digest, first_seen, last_scraped, data in rows:
+                records[post_url] = {
+                    'content_hash': digest,
+                    'first_seen': first_seen,
+                    'last_scraped': last_scraped,
+                    'data': json.loads(data) if data else None
+                }
+        return records
+
+    def record(self, category_url, blog_data, digest):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            'INSERT INTO seen_posts (category_url, post_url, content_hash, first_seen, last_scraped, data) '
+            'VALUES (?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT (category_url, post_url) DO UPDATE SET '
+            'content_hash = excluded.content_hash, last_scraped = excluded.last_scraped, data = excluded.data',
+            (category_url, blog_data['url'], digest, now, now, json.dumps(blog_data))
+        )
+        conn.commit()
+
+
+class IncrementalPlan:
+    """Decides which posts of one category need fetching and labels the results"""
+
+    def __init__(self, index, category_url, post_urls, stale_after):
+        self.index = index
+        self.category_url = category_url
+        self.stale_after = stale_after
+        self.previous = index.lookup(category_url, post_urls)
+        self.now = time.time()
+
+    def extend(self, post_urls):
+        """Load index records for posts discovered after the plan was made"""
+        self.previous.update(self.index.lookup(self.category_url, post_urls))
+
+    def needs_fetch(self, post_url):
+        record = self.previous.get(post_url)
+        return (record is None or record['data'] is None or
+                self.now - record['last_scraped'] > self.stale_after)
+
+    def cached(self, post_url):
+        """The stored row for a post that does not need fetching, marked unchanged"""
+        return dict(self.previous[post_url]['data'], change_status=UNCHANGED)
+
+    def label(self, blog_data):
+        """Record a freshly scraped post and mark it added, updated or unchanged"""
+        record = self.previous.get(blog_data['url'])
+        digest = content_hash(blog_data)
+        if record is None:
+            status = ADDED
+        elif record['content_hash'] == digest:
+            status = UNCHANGED
+        else:
+            status = UPDATED
+        self.index.record(self.category_url, blog_data, digest)
+        return dict(blog_data, change_status=status)
+
+
+def summarize_changes(blogs):
+    counts = dict.fromkeys([ADDED, UPDATED, UNCHANGED], 0)
+    for blog in blogs:
+        if blog.get('change_status') in counts:
+            counts[blog['change_status']] += 1
+    return counts
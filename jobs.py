@@ -0,0 +1,211 @@
+import json
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+JOB_FIELDS = ['id', 'status', 'url', 'params', 'progress_done', 'progress_total',
+              'error', 'created_at', 'updated_at']
+
+
+def _now():
+    return datetime.now().isoformat()
+
+
+class JobStore:
+    """Interface for storing scrape jobs and their results"""
+
+    def create(self, url, params):
+        raise NotImplementedError
+
+    def get(self, job_id):
+        raise NotImplementedError
+
+    def update(self, job_id, **fields):
+        raise NotImplementedError
+
+    def set_result(self, job_id, result):
+        raise NotImplementedError
+
+    def get_result(self, job_id):
+        raise NotImplementedError
+
+    def _new_job(self, url, params):
+        now = _now()
+        return {
+            'id': uuid.uuid4().hex,
+            'status': QUEUED,
+            'url': url,
+            'params': params or {},
+            'progress_done': 0,
+            'progress_total': 0,
+            'error': None,
+            'created_at': now,
+            'updated_at': now
+        }
+
+
+class MemoryJobStore(JobStore):
+    """Job store local to one process"""
+
+    def __init__(self):
+        self.jobs = {}
+        self.results = {}
+        self.lock = threading.Lock()
+
+    def create(self, url, params=None):
+        job = self._new_job(url, params)
+        with self.lock:
+            self.jobs[job['id']] = job
+        return job['id']
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def update(self, job_id, **fields):
+        with self.lock:
+            if job_id in self.jobs:
+                self.jobs[job_id].update(fields, updated_at=_now())
+
+    def set_result(self, job_id, result):
+        with self.lock:
+            self.results[job_id] = result
+
+    def get_result(self, job_id):
+        with self.lock:
+            return self.results.get(job_id)
+
+
+class SQLiteJobStore(JobStore):
+    """Job store in a SQLite file so several gunicorn workers can share jobs"""
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    url TEXT,
+                    params TEXT,
+                    progress_done INTEGER DEFAULT 0,
+                    progress_total INTEGER DEFAULT 0,
+                    error TEXT,
+                    created_at TEXT,
+                    updated_at TEXT,
+                    result TEXT
+                )
+            """)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def create(self, url, params=None):
+        job = self._new_job(url, params)
+        job['params'] = json.dumps(job['params'])
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT INTO jobs ({', '.join(JOB_FIELDS)}) VALUES ({', '.join('?' * len(JOB_FIELDS))})",
+                [job[field] for field in JOB_FIELDS]
+            )
+        return job['id']
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {', '.join(JOB_FIELDS)} FROM jobs WHERE id = ?",
+                               (job_id,)).fetchone()
+        if not row:
+            return None
+        job = dict(row)
+        job['params'] = json.loads(job['params'] or '{}')
+        return job
+
+    def update(self, job_id, **fields):
+        fields = {key: value for key, value in fields.items() if key in JOB_FIELDS}
+        fields['updated_at'] = _now()
+        if 'params' in fields:
+            fields['params'] = json.dumps(fields['params'])
+        assignments = ', '.join(f'{key} = ?' for key in fields)
+        with self._connect() as conn:
+            conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', [*fields.values(), job_id])
+
+    def set_result(self, job_id, result):
+        with self._connect() as conn:
+            conn.execute('UPDATE jobs SET result = ? WHERE id = ?', (json.dumps(result), job_id))
+
+    def get_result(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute('SELECT result FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if not row or row['result'] is None:
+            return None
+        return json.loads(row['result'])
+
+
+class JobRunner:
+    """Runs scrape jobs on a background thread pool"""
+
+    def __init__(self, store, scrape_func, max_workers=2):
+        self.store = store
+        self.scrape_func = scrape_func
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scrape-job')
+        self.active = set()
+        self.lock = threading.Lock()
+
+    def submit(self, url, params=None):
+        """Queue a scrape and return its job id straight away"""
+        job_id = self.store.create(url, params)
+        self._start(job_id, url, params or {})
+        return job_id
+
+    def resume(self, job_id):
+        """Queue an unfinished job again under the same id"""
+        job = self.store.get(job_id)
+        self.store.update(job_id, status=QUEUED, error=None)
+        self._start(job_id, job['url'], job['params'])
+
+    def is_active(self, job_id):
+        """True while the job is queued or running in this process"""
+        with self.lock:
+            return job_id in self.active
+
+    def _start(self, job_id, url, params):
+        with self.lock:
+            self.active.add(job_id)
+        self.executor.submit(self._run, job_id, url, params)
+
+    def _run(self, job_id, url, params):
+        self.store.update(job_id, status=RUNNING)
+
+        def on_progress(done, total):
+            self.store.update(job_id, progress_done=done, progress_total=total)
+
+        try:
+            result = self.scrape_func(job_id, url, params, on_progress)
+            self.store.set_result(job_id, result)
+            self.store.update(job_id, status=DONE)
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            self.store.update(job_id, status=FAILED, error=str(e))
+        finally:
+            with self.lock:
+                self.active.discard(job_id)
+
+
+def create_job_store(spec):
+    """Build a job store from a spec such as 'memory' or 'sqlite:///path/to/jobs.db'"""
+    if not spec or spec == 'memory':
+        return MemoryJobStore()
+    if spec.startswith('sqlite:///'):
+        return SQLiteJobStore(spec[len('sqlite:///'):])
+    raise ValueError(f"Unknown job store: {spec}")
@@ -0,0 +1,177 @@
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _label_text(labelnames, values):
+    if not labelnames:
+        return ''
+    pairs = []
+    for name, value in zip(labelnames, values):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{escaped}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            items = sorted(self.values.items())
+        return [(self.name, _label_text(self.labelnames, key), value) for key, value in items]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition layout"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}  # labels -> [bucket counts..., sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self.lock:
+            series = self.series.setdefault(key, [0] * (len(self.buckets) + 2))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        with self.lock:
+            items = sorted((key, list(series)) for key, series in self.series.items())
+        samples = []
+        for key, series in items:
+            for bound, count in zip(self.buckets, series):
+                labels = _label_text(self.labelnames + ('le',), key + (repr(float(bound)),))
+                samples.append((f'{self.name}_bucket', labels, count))
+            labels = _label_text(self.labelnames + ('le',), key + ('+Inf',))
+            samples.append((f'{self.name}_bucket', labels, series[-1]))
+            samples.append((f'{self.name}_sum', _label_text(self.labelnames, key), series[-2]))
+            samples.append((f'{self.name}_count', _label_text(self.labelnames, key), series[-1]))
+        return samples
+
+
+class Registry:
+    """Collects metrics and renders them in the Prometheus text format
+
+    Values are per process; under a multi-worker server each worker
+    reports its own series.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.gauge_callbacks = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def register_gauges(self, callback):
+        """callback() returns [(name, documentation, labelnames, {label values: value})] at scrape time"""
+        self.gauge_callbacks.append(callback)
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(f'{name}{labels} {value}' for name, labels, value in metric.samples())
+        for callback in self.gauge_callbacks:
+            for name, documentation, labelnames, values in callback():
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} gauge')
+                lines.extend(f'{name}{_label_text(labelnames, key)} {value}' for key, value in values.items())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'scraper_stage_seconds', 'Time spent per scrape stage', ['stage']))
+FETCH_BYTES = REGISTRY.register(Counter(
+    'scraper_fetch_bytes_total', 'Bytes of page bodies downloaded'))
+FETCH_ERRORS = REGISTRY.register(Counter(
+    'scraper_fetch_errors_total', 'Failed or aborted page downloads by error type', ['type']))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    'scraper_http_cache_lookups_total', 'Page fetches by HTTP cache outcome', ['result']))
+POSTS_SCRAPED = REGISTRY.register(Counter(
+    'scraper_posts_scraped_total', 'Blog posts extracted'))
+EXPORT_BYTES = REGISTRY.register(Counter(
+    'scraper_export_bytes_total', 'Bytes of exported results by format', ['format']))
+
+
+class StageTimings:
+    """Per-scrape time breakdown that also feeds the process-wide stage histogram"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals = {}
+
+    @contextmanager
+    def time(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+
+    def record(self, stage, seconds):
+        STAGE_SECONDS.observe(seconds, stage=stage)
+        with self.lock:
+            total, count = self.totals.get(stage, (0.0, 0))
+            self.totals[stage] = (total + seconds, count + 1)
+
+    def to_dict(self):
+        """{stage: {'seconds': total, 'count': n}}; fetch threads overlap, so totals can exceed wall time"""
+        with self.lock:
+            return {stage: {'seconds': round(total, 4), 'count': count}
+                    for stage, (total, count) in self.totals.items()}
+
+
+def timed_iter(chunks, stage, byte_counter=None, **labels):
+    """Wrap a chunk iterator, recording time spent producing chunks under stage
+
+    Only time inside next() is counted, not time the consumer spends writing
+    chunks out; byte_counter, if given, counts the chunk sizes with labels.
+    """
+    elapsed = 0.0
+    iterator = iter(chunks)
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed += time.perf_counter() - started
+            if byte_counter is not None:
+                byte_counter.inc(len(chunk), **labels)
+            yield chunk
+    finally:
+        STAGE_SECONDS.observe(elapsed, stage=stage)
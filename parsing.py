@@ -0,0 +1,149 @@
+import os
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, FeatureNotFound, SoupStrainer
+
+from profiles import PROFILES
+from textextract import MARKDOWN, TEXT, extract_text, text_stats
+
+# lxml is much faster than the pure-Python html.parser; override with SCRAPER_PARSER
+DEFAULT_PARSER = os.environ.get('SCRAPER_PARSER', 'lxml')
+PARSERS = ('lxml', 'html.parser', 'html5lib')
+
+BLOG_FIELDS = ['title', 'url', 'date', 'categories', 'meta_description', 'featured_image', 'content',
+               'word_count', 'reading_time']
+
+# Date selectors in priority order, as (tag name or None, class or None)
+DATE_SELECTORS = [
+    ('time', None),  # time[datetime]
+    (None, 'date'),
+    (None, 'post-date'),
+    (None, 'published')
+]
+
+CONTENT_SLOTS = ['div.post-content', 'article', 'div.content']
+
+
+def make_soup(html_content, parser=None, parse_only=None):
+    """Build a BeautifulSoup tree, falling back to html.parser if the backend is missing"""
+    parser = parser or DEFAULT_PARSER
+    try:
+        return BeautifulSoup(html_content, parser, parse_only=parse_only)
+    except FeatureNotFound:
+        return BeautifulSoup(html_content, 'html.parser', parse_only=parse_only)
+
+
+def anchor_soup(html_content, parser=None):
+    """Tree holding only <a href> and <link href> tags, for link extraction"""
+    return make_soup(html_content, parser, parse_only=SoupStrainer(['a', 'link'], href=True))
+
+
+def _is_category_href(href):
+    return 'blog_categories' in href or 'category' in href
+
+
+def collect_elements(soup):
+    """Walk the tree once and record every element the extractor needs"""
+    found = {'categories': []}
+    dates = [None] * len(DATE_SELECTORS)
+
+    for tag in soup.find_all(True):
+        name = tag.name
+        classes = tag.get('class') or ()
+
+        if name == 'h1':
+            found.setdefault('h1', tag)
+        elif name == 'title':
+            found.setdefault('title', tag)
+        elif name == 'article':
+            found.setdefault('article', tag)
+        elif name == 'img':
+            found.setdefault('img', tag)
+        elif name == 'div':
+            if 'post-content' in classes:
+                found.setdefault('div.post-content', tag)
+            if 'content' in classes:
+                found.setdefault('div.content', tag)
+        elif name == 'meta':
+            if tag.get('name') == 'description':
+                found.setdefault('meta_description', tag)
+            if tag.get('property') == 'og:image':
+                found.setdefault('og_image', tag)
+        elif name == 'a':
+            href = tag.get('href')
+            if href and _is_category_href(href):
+                found['categories'].append(tag)
+
+        if name != 'time' and not classes:
+            continue
+        for index, (selector_name, selector_class) in enumerate(DATE_SELECTORS):
+            if dates[index] is None:
+                if selector_name:
+                    if name == selector_name and tag.has_attr('datetime'):
+                        dates[index] = tag
+                elif selector_class in classes:
+                    dates[index] = tag
+
+    found['date'] = next((tag for tag in dates if tag is not None), None)
+    return found
+
+
+def extract_blog_data(html_content, blog_url, parser=None, content_format=TEXT):
+    """Parse a blog post page into the CSV fields
+
+    With the lxml parser the page's host profile (profiles.py) runs compiled
+    XPath selectors on a bare lxml tree; other parsers walk a BeautifulSoup tree.
+    content is plain text with blank lines between paragraphs, or Markdown
+    with content_format='markdown' (textextract.py).
+    """
+    if (parser or DEFAULT_PARSER) == 'lxml':
+        blog_data = dict.fromkeys(BLOG_FIELDS, '')
+        blog_data['url'] = blog_url
+        blog_data.update(PROFILES.extract(html_content, blog_url, content_format == MARKDOWN))
+        blog_data.update(text_stats(blog_data['content'], content_format == MARKDOWN))
+        return blog_data
+    return extract_with_soup(html_content, blog_url, parser, content_format)
+
+
+def extract_with_soup(html_content, blog_url, parser=None, content_format=TEXT):
+    """Parse a blog post page into the CSV fields in a single BeautifulSoup tree walk"""
+    soup = make_soup(html_content, parser)
+    found = collect_elements(soup)
+
+    blog_data = dict.fromkeys(BLOG_FIELDS, '')
+    blog_data['url'] = blog_url
+
+    # Extract title
+    title_tag = found.get('h1') or found.get('title')
+    if title_tag:
+        blog_data['title'] = title_tag.get_text(strip=True)
+
+    # Extract content
+    content_div = next((found[slot] for slot in CONTENT_SLOTS if slot in found), None)
+    if content_div:
+        blog_data['content'] = extract_text(content_div, content_format == MARKDOWN)
+    blog_data.update(text_stats(blog_data['content'], content_format == MARKDOWN))
+
+    # Extract meta description
+    if 'meta_description' in found:
+        blog_data['meta_description'] = found['meta_description'].get('content', '')
+
+    # Extract featured image
+    if 'og_image' in found:
+        blog_data['featured_image'] = found['og_image'].get('content', '')
+    elif 'img' in found:
+        img_src = found['img'].get('src', '')
+        if img_src.startswith('/'):
+            img_src = urljoin(blog_url, img_src)
+        blog_data['featured_image'] = img_src
+
+    # Extract date
+    date_elem = found['date']
+    if date_elem:
+        blog_data['date'] = date_elem.get('datetime') or date_elem.get_text(strip=True)
+
+    # Extract categories
+    categories = [cat_link.get_text(strip=True) for cat_link in found['categories']]
+    blog_data['categories'] = ', '.join(category for category in categories if category)
+
+    return blog_data
@@ -0,0 +1,79 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from parsing import extract_blog_data
+from textextract import TEXT
+
+
+class ParsePool:
+    """CPU stage that runs blog extraction in worker processes, outside the GIL
+
+    Fetch threads hand raw HTML to parse(); at most max_pending pages wait in
+    the process pool's queue, and further fetch threads block until a slot
+    frees up, so a slow parse stage throttles fetching instead of buffering
+    pages in memory.
+    """
+
+    def __init__(self, workers=None, max_pending=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 4
+        self.slots = threading.BoundedSemaphore(self.max_pending)
+        self.lock = threading.Lock()
+        self.executor = None
+
+    def _executor(self):
+        with self.lock:
+            if self.executor is None:
+                # forkserver avoids forking a process that already has fetch threads running
+                method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                    mp_context=multiprocessing.get_context(method))
+            return self.executor
+
+    def submit(self, func, *args):
+        """Queue func(*args) on a worker process, waiting for a free slot first"""
+        self.slots.acquire()
+        try:
+            future = self._executor().submit(func, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def parse(self, html_content, blog_url, parser=None, content_format=TEXT):
+        """extract_blog_data on a worker process, falling back to this thread if the pool broke"""
+        try:
+            return self.submit(extract_blog_data, html_content, blog_url, parser, content_format).result()
+        except BrokenProcessPool as e:
+            print(f"Parse pool failed, parsing {blog_url} in-thread: {e}")
+            with self.lock:
+                broken, self.executor = self.executor, None
+            if broken is not None:
+                broken.shutdown(wait=False)
+            return extract_blog_data(html_content, blog_url, parser, content_format)
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(cancel_futures=True)
+                self.executor = None
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_parse_pool():
+    """The process-wide ParsePool sized by PARSE_WORKERS, or None when it is unset or 0"""
+    global _shared_pool
+    workers = int(os.environ.get('PARSE_WORKERS', 0))
+    if workers <= 0:
+        return None
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ParsePool(workers, int(os.environ.get('PARSE_QUEUE_SIZE', 0)) or None)
+        return _shared_pool
@@ -0,0 +1,269 @@
+import re
+import threading
+from urllib.parse import urljoin, urlparse
+
+from lxml import etree
+
+from textextract import extract_text
+
+# Fallback selectors per field in priority order. The first selector that
+# matches on a page supplies the field; ::attr(name) reads an attribute of the
+# matched element instead of its text. The first selectors of each field are
+# the ones massmailer.io uses, the rest cover common blog themes.
+FIELD_SELECTORS = {
+    'title': ['h1', 'title'],
+    'date': [
+        'time[datetime]', '.date', '.post-date', '.published',
+        'meta[property="article:published_time"]::attr(content)', '[itemprop="datePublished"]'
+    ],
+    'categories': [
+        'a[href*="blog_categories"], a[href*="category"]', 'a[rel~="tag"]', '.post-categories a', '.tags a'
+    ],
+    'meta_description': [
+        'meta[name="description"]::attr(content)', 'meta[property="og:description"]::attr(content)'
+    ],
+    'featured_image': [
+        'meta[property="og:image"]::attr(content)', 'meta[name="twitter:image"]::attr(content)', 'img::attr(src)'
+    ],
+    'content': [
+        'div.post-content', 'article', 'div.content', '.entry-content', '.post-body',
+        '[itemprop="articleBody"]', 'main'
+    ]
+}
+
+# Pages per host that try every selector before the host's profile is fixed
+LEARN_PAGES = 5
+
+ATTR_SUFFIX_RE = re.compile(r'::attr\(([\w-]+)\)$')
+COMPOUND_RE = re.compile(r'(\*|[a-zA-Z][\w-]*)?((?:[.#][\w-]+|\[[^\]]*\])*)')
+PART_RE = re.compile(r'\.([\w-]+)|#([\w-]+)|\[\s*([\w-]+)\s*(?:([~*^$]?=)\s*(?:"([^"]*)"|\'([^\']*)\'|([^\]\s]+)))?\s*\]')
+
+ALL_TEXT = etree.XPath('.//text()')
+
+_parsers = threading.local()
+
+
+def _literal(value):
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    raise ValueError(f'cannot quote {value!r} in XPath')
+
+
+def _predicate(match):
+    class_name, element_id, attr, operator = match.group(1, 2, 3, 4)
+    if class_name:
+        return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+    if element_id:
+        return f'@id={_literal(element_id)}'
+    if not operator:
+        return f'@{attr}'
+    value = next(group for group in match.group(5, 6, 7) if group is not None)
+    if operator == '=':
+        return f'@{attr}={_literal(value)}'
+    if operator == '~=':
+        return f"contains(concat(' ', normalize-space(@{attr}), ' '), {_literal(f' {value} ')})"
+    if operator == '*=':
+        return f'contains(@{attr}, {_literal(value)})'
+    if operator == '^=':
+        return f'starts-with(@{attr}, {_literal(value)})'
+    return f'substring(@{attr}, string-length(@{attr}) - {len(value) - 1})={_literal(value)}'
+
+
+def _compile_selector(selector):
+    steps = []
+    axis = '//'
+    position = 0
+    selector = selector.strip()
+    while position < len(selector):
+        if selector[position].isspace():
+            position += 1
+            continue
+        if selector[position] == '>':
+            axis = '/'
+            position += 1
+            continue
+        match = COMPOUND_RE.match(selector, position)
+        if not match.group(0):
+            raise ValueError(f'unsupported selector {selector!r}')
+        predicates = [_predicate(part) for part in PART_RE.finditer(match.group(2))]
+        if ''.join(part.group(0) for part in PART_RE.finditer(match.group(2))) != match.group(2):
+            raise ValueError(f'unsupported selector {selector!r}')
+        steps.append(axis + (match.group(1) or '*') + ''.join(f'[{predicate}]' for predicate in predicates))
+        axis = '//'
+        position = match.end()
+    if not steps or axis == '/':
+        raise ValueError(f'unsupported selector {selector!r}')
+    return ''.join(steps)
+
+
+def css_to_xpath(selector):
+    """XPath for a CSS selector group using tags, .class, #id, [attr] tests and ' ' or '>' combinators"""
+    return ' | '.join(_compile_selector(part) for part in selector.split(','))
+
+
+class Rule:
+    """One compiled fallback selector of a field"""
+
+    def __init__(self, selector):
+        self.selector = selector
+        match = ATTR_SUFFIX_RE.search(selector)
+        self.attr = match.group(1) if match else None
+        self.xpath = etree.XPath(css_to_xpath(selector[:match.start()] if match else selector))
+
+    def find(self, root):
+        return self.xpath(root)
+
+
+def _text(element, xpath=ALL_TEXT):
+    # Same as BeautifulSoup's get_text(strip=True): stripped strings joined without a separator
+    return ''.join(text.strip() for text in xpath(element))
+
+
+def field_value(field, rule, elements, page_url, markdown=False):
+    """The field's value from the elements rule matched; content is Markdown with markdown=True"""
+    if field == 'categories':
+        names = (_text(element) for element in elements)
+        return ', '.join(name for name in names if name)
+    element = elements[0]
+    if rule.attr:
+        value = element.get(rule.attr, '')
+    elif field == 'content':
+        value = extract_text(element, markdown)
+    elif field == 'date':
+        value = element.get('datetime') or _text(element)
+    else:
+        value = _text(element)
+    if field == 'featured_image' and value.startswith('/'):
+        value = urljoin(page_url, value)
+    return value
+
+
+def parse_html(html_content):
+    """lxml tree of a page, or None if it has no markup"""
+    parser = getattr(_parsers, 'parser', None)
+    if parser is None:
+        # lxml parsers must not be shared between threads
+        parser = _parsers.parser = etree.HTMLParser()
+    try:
+        try:
+            return etree.fromstring(html_content, parser)
+        except ValueError:
+            # str input with an XML encoding declaration
+            return etree.fromstring(html_content.encode('utf-8'), parser)
+    except etree.XMLSyntaxError:
+        return None
+
+
+class SiteProfile:
+    """Which selector supplies each field on one host, learned from its first pages
+
+    While learning, every fallback is tried and the first match is recorded.
+    Once learn_pages pages are in, each field runs only its winning
+    selectors; the full chain runs again only when they all miss, and a
+    selector that wins then joins the winners.
+    """
+
+    def __init__(self, rules, learn_pages=LEARN_PAGES):
+        self.rules = rules
+        self.learn_pages = learn_pages
+        self.pages = 0
+        self.winners = None  # {field: tuple of rule indexes}, set once learned
+        self.wins = {field: {} for field in rules}
+        self.fallbacks = 0
+        self.lock = threading.Lock()
+
+    def _first_match(self, root, field, indexes):
+        for index in indexes:
+            elements = self.rules[field][index].find(root)
+            if elements:
+                return index, elements
+        return None, None
+
+    def extract(self, root, page_url, markdown=False):
+        """{field: value} for a parsed page, '' for fields with no match"""
+        winners = self.winners
+        values = {}
+        matched = {}
+        for field, rules in self.rules.items():
+            first = winners[field] if winners is not None else ()
+            index, elements = self._first_match(root, field, first)
+            if elements is None:
+                index, elements = self._first_match(root, field, [i for i in range(len(rules)) if i not in first])
+                if elements is not None:
+                    matched[field] = index
+            values[field] = (field_value(field, rules[index], elements, page_url, markdown)
+                             if elements is not None else '')
+        if winners is None:
+            self._learn(matched)
+        elif matched:
+            self._add_winners(matched)
+        return values
+
+    def _learn(self, matched):
+        with self.lock:
+            if self.winners is not None:
+                return
+            for field, index in matched.items():
+                self.wins[field][index] = self.wins[field].get(index, 0) + 1
+            self.pages += 1
+            if self.pages >= self.learn_pages:
+                # Priority order, so a page matching several winners gives the same answer as the full chain
+                self.winners = {field: tuple(sorted(self.wins[field])) for field in self.rules}
+
+    def _add_winners(self, matched):
+        with self.lock:
+            self.fallbacks += 1
+            self.winners = {field: tuple(sorted({*indexes, matched[field]})) if field in matched else indexes
+                            for field, indexes in self.winners.items()}
+
+    def stats(self):
+        with self.lock:
+            return {
+                'learned': self.winners is not None,
+                'pages_learned_from': self.pages,
+                'fallbacks': self.fallbacks,
+                'selectors': {field: [self.rules[field][index].selector for index in indexes]
+                              for field, indexes in self.winners.items()} if self.winners is not None else None
+            }
+
+
+class ProfileCache:
+    """Compiled extraction rules plus a learned SiteProfile per host
+
+    Each process keeps its own cache, so parse pool workers learn separately.
+    """
+
+    def __init__(self, field_selectors=None, learn_pages=LEARN_PAGES, max_hosts=1000):
+        self.rules = {field: [Rule(selector) for selector in selectors]
+                      for field, selectors in (field_selectors or FIELD_SELECTORS).items()}
+        self.learn_pages = learn_pages
+        self.max_hosts = max_hosts
+        self.profiles = {}
+        self.lock = threading.Lock()
+
+    def profile(self, url):
+        host = urlparse(url).netloc.lower()
+        with self.lock:
+            profile = self.profiles.get(host)
+            if profile is None:
+                if len(self.profiles) >= self.max_hosts:
+                    self.profiles.pop(next(iter(self.profiles)))
+                profile = self.profiles[host] = SiteProfile(self.rules, self.learn_pages)
+            return profile
+
+    def extract(self, html_content, page_url, markdown=False):
+        """{field: value} for a page using its host's profile"""
+        root = parse_html(html_content)
+        if root is None:
+            return dict.fromkeys(self.rules, '')
+        return self.profile(page_url).extract(root, page_url, markdown)
+
+    def stats(self):
+        with self.lock:
+            profiles = dict(self.profiles)
+        return {host: profile.stats() for host, profile in profiles.items()}
+
+
+PROFILES = ProfileCache()
@@ -0,0 +1,277 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+# Responses that mean the host wants us to slow down
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delay or HTTP date), or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate` tokens per second"""
+
+    def __init__(self, rate, capacity=1):
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until it is available"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Reserve the token even if it is not there yet so waiters queue up
+            # one interval apart instead of waking together
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class HostRateLimiter:
+    """Per-host requests/sec and max in-flight limits for concurrent fetching"""
+
+    def __init__(self, requests_per_second=2.0, max_in_flight=2, burst=1):
+        self.requests_per_second = requests_per_second
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.burst = burst
+        self.buckets = {}
+        self.semaphores = {}
+        self.lock = threading.Lock()
+
+    def _host_state(self, host):
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.requests_per_second, self.burst)
+                self.semaphores[host] = threading.BoundedSemaphore(self.max_in_flight)
+            return self.buckets[host], self.semaphores[host]
+
+    @contextmanager
+    def limit(self, url):
+        """Hold an in-flight slot and a rate token for the URL's host"""
+        bucket, semaphore = self._host_state(urlparse(url).netloc)
+        with semaphore:
+            bucket.acquire()
+            yield
+
+    def record(self, url, status=None, latency=None, retry_after=None):
+        """Fixed limits do not adapt to responses"""
+
+    def stats(self):
+        return {}
+
+
+class HostPace:
+    """Request spacing and feedback for one host of an AdaptiveHostLimiter"""
+
+    def __init__(self, interval, min_interval, max_in_flight):
+        self.interval = interval
+        self.min_interval = min_interval
+        self.next_at = 0.0
+        self.latency = None
+        self.throttled = 0
+        self.semaphore = threading.BoundedSemaphore(max_in_flight)
+        self.lock = threading.Lock()
+
+
+class AdaptiveHostLimiter:
+    """Per-host pacing that follows robots.txt Crawl-delay and adapts to the server
+
+    Each host starts at requests_per_second. A 429 or 503 doubles the gap
+    between requests (or waits out Retry-After, whichever is longer), slow
+    responses widen it, and fast ones narrow it step by step down to
+    max_requests_per_second, never below the host's Crawl-delay.
+    """
+
+    def __init__(self, requests_per_second=2.0, max_in_flight=2, max_requests_per_second=10.0,
+                 robots=None, max_interval=60.0, fast_latency=0.5, slow_latency=2.0):
+        if requests_per_second <= 0 or max_requests_per_second <= 0:
+            raise ValueError('rates must be positive')
+        self.start_interval = 1.0 / requests_per_second
+        self.floor_interval = 1.0 / max(max_requests_per_second, requests_per_second)
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.robots = robots
+        self.max_interval = max_interval
+        self.fast_latency = fast_latency
+        self.slow_latency = slow_latency
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def _pace(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            pace = self.hosts.get(host)
+        if pace is None:
+            # Crawl-delay is looked up outside the lock; it may fetch robots.txt
+            crawl_delay = self.robots.crawl_delay(url) if self.robots else None
+            min_interval = max(self.floor_interval, crawl_delay or 0)
+            with self.lock:
+                pace = self.hosts.setdefault(host, HostPace(max(self.start_interval, min_interval), min_interval,
+                                                            self.max_in_flight))
+        return pace
+
+    @contextmanager
+    def limit(self, url):
+        """Hold an in-flight slot for the URL's host and wait for its next turn"""
+        pace = self._pace(url)
+        with pace.semaphore:
+            with pace.lock:
+                now = time.monotonic()
+                start = max(now, pace.next_at)
+                pace.next_at = start + pace.interval
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+    def record(self, url, status=None, latency=None, retry_after=None):
+        """Feed back a response: its status, seconds to first byte and any Retry-After"""
+        pace = self._pace(url)
+        with pace.lock:
+            self._adapt(pace, status, latency, retry_after, time.monotonic())
+
+    def _adapt(self, pace, status, latency, retry_after, now):
+        if status in THROTTLE_STATUSES:
+            pace.throttled += 1
+            pace.interval = min(self.max_interval, max(pace.interval * 2, retry_after or 0))
+            if retry_after:
+                # A host asking for more than max_interval is not waited out; callers give up on the URL
+                pace.next_at = max(pace.next_at, now + min(retry_after, self.max_interval))
+        elif latency is not None:
+            pace.latency = latency if pace.latency is None else 0.8 * pace.latency + 0.2 * latency
+            if pace.latency < self.fast_latency:
+                pace.interval = max(pace.min_interval, pace.interval * 0.9)
+            elif pace.latency > self.slow_latency:
+                pace.interval = min(self.max_interval, pace.interval * 1.5)
+
+    def stats(self):
+        with self.lock:
+            hosts = dict(self.hosts)
+        return {host: {
+            'requests_per_second': round(1.0 / pace.interval, 3),
+            'min_interval': round(pace.min_interval, 3),
+            'latency_ms': round(pace.latency * 1000, 1) if pace.latency is not None else None,
+            'throttled': pace.throttled
+        } for host, pace in hosts.items()}
+
+
+class SharedHostLimiter(AdaptiveHostLimiter):
+    """AdaptiveHostLimiter whose per-host pace lives in a SQLite file shared by worker processes
+
+    Every process reserves its requests from the same per-host schedule, so
+    the request rate, Crawl-delay and backoff after 429/503 hold across all
+    workers rather than per process. Times are wall-clock, so workers on
+    different machines need synchronized clocks. max_in_flight still applies
+    per process.
+    """
+
+    def __init__(self, path, requests_per_second=2.0, max_in_flight=2, max_requests_per_second=10.0,
+                 robots=None, **kwargs):
+        super().__init__(requests_per_second, max_in_flight, max_requests_per_second, robots, **kwargs)
+        self.path = path
+        self.local = threading.local()
+        self.semaphores = {}
+        self.known = set()  # hosts this process has seen in the table
+        self._conn().execute("""
+            CREATE TABLE IF NOT EXISTS host_pace (
+                host TEXT PRIMARY KEY,
+                interval REAL NOT NULL,
+                min_interval REAL NOT NULL,
+                next_at REAL NOT NULL DEFAULT 0,
+                latency REAL,
+                throttled INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+
+    def _conn(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self.local.conn = conn
+        return conn
+
+    @contextmanager
+    def _host_row(self, url):
+        """The host's HostPace read inside a write transaction, written back on exit"""
+        host = urlparse(url).netloc
+        if host not in self.known:
+            # Crawl-delay is looked up before taking the write lock; it may fetch robots.txt
+            crawl_delay = self.robots.crawl_delay(url) if self.robots else None
+            min_interval = max(self.floor_interval, crawl_delay or 0)
+            self._conn().execute('INSERT OR IGNORE INTO host_pace (host, interval, min_interval) VALUES (?, ?, ?)',
+                                 (host, max(self.start_interval, min_interval), min_interval))
+            with self.lock:
+                self.known.add(host)
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            interval, min_interval, next_at, latency, throttled = conn.execute(
+                'SELECT interval, min_interval, next_at, latency, throttled FROM host_pace WHERE host = ?',
+                (host,)).fetchone()
+            pace = HostPace(interval, min_interval, 1)
+            pace.next_at, pace.latency, pace.throttled = next_at, latency, throttled
+            yield pace
+            conn.execute('UPDATE host_pace SET interval = ?, next_at = ?, latency = ?, throttled = ? WHERE host = ?',
+                         (pace.interval, pace.next_at, pace.latency, pace.throttled, host))
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _semaphore(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            return self.semaphores.setdefault(host, threading.BoundedSemaphore(self.max_in_flight))
+
+    @contextmanager
+    def limit(self, url):
+        """Hold an in-flight slot and wait for the host's next turn on the shared schedule"""
+        with self._semaphore(url):
+            with self._host_row(url) as pace:
+                # Read the clock once the row's write lock is held, not before waiting for it
+                now = time.time()
+                start = max(now, pace.next_at)
+                pace.next_at = start + pace.interval
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+    def record(self, url, status=None, latency=None, retry_after=None):
+        with self._host_row(url) as pace:
+            self._adapt(pace, status, latency, retry_after, time.time())
+
+    def stats(self):
+        with self.lock:
+            hosts = sorted(self.known)
+        if not hosts:
+            return {}
+        rows = self._conn().execute(
+            f"SELECT host, interval, min_interval, latency, throttled FROM host_pace "
+            f"WHERE host IN ({', '.join('?' * len(hosts))})", hosts).fetchall()
+        return {host: {
+            'requests_per_second': round(1.0 / interval, 3),
+            'min_interval': round(min_interval, 3),
+            'latency_ms': round(latency * 1000, 1) if latency is not None else None,
+            'throttled': throttled
+        } for host, interval, min_interval, latency, throttled in rows}
@@ -0,0 +1,88 @@
+import sys
+import zlib
+
+from parsing import BLOG_FIELDS
+
+# Shorter content is kept as plain text; compressing it saves too little to pay for the work
+COMPRESS_MIN_CHARS = 512
+
+_FIELDS = tuple(BLOG_FIELDS)
+_FIELD_SET = frozenset(BLOG_FIELDS)
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class BlogRecord:
+    """Compact stored form of a scraped post
+
+    The blog fields live in slots instead of a per-row dict, content longer
+    than COMPRESS_MIN_CHARS is held zlib-compressed until the row is read
+    back, and categories and dates are interned since posts of one category
+    repeat them. to_dict() returns exactly the dict the record was built from.
+    """
+
+    __slots__ = ('title', 'url', 'date', 'categories', 'meta_description', 'featured_image',
+                 '_content', 'word_count', 'reading_time', 'extra', 'key_order')
+
+    @classmethod
+    def from_dict(cls, blog):
+        record = cls.__new__(cls)
+        record.title = blog.get('title', '')
+        record.url = blog.get('url', '')
+        record.date = _intern(blog.get('date', ''))
+        record.categories = _intern(blog.get('categories', ''))
+        record.meta_description = blog.get('meta_description', '')
+        record.featured_image = blog.get('featured_image', '')
+        record._content = cls._pack(blog.get('content', ''))
+        record.word_count = blog.get('word_count', '')
+        record.reading_time = blog.get('reading_time', '')
+        # Keys beyond the blog fields, e.g. change_status or sources
+        record.extra = {key: value for key, value in blog.items() if key not in _FIELD_SET} or None
+        keys = tuple(blog)
+        # Rows almost always have the fields in BLOG_FIELDS order; only odd ones pay for their key order
+        record.key_order = None if keys == _FIELDS + tuple(record.extra or ()) else keys
+        return record
+
+    @staticmethod
+    def _pack(content):
+        if isinstance(content, str) and len(content) >= COMPRESS_MIN_CHARS:
+            packed = zlib.compress(content.encode('utf-8', 'surrogatepass'))
+            if len(packed) < len(content):
+                return packed
+        return content
+
+    @property
+    def content(self):
+        if isinstance(self._content, bytes):
+            return zlib.decompress(self._content).decode('utf-8', 'surrogatepass')
+        return self._content
+
+    def to_dict(self):
+        blog = {
+            'title': self.title,
+            'url': self.url,
+            'date': self.date,
+            'categories': self.categories,
+            'meta_description': self.meta_description,
+            'featured_image': self.featured_image,
+            'content': self.content,
+            'word_count': self.word_count,
+            'reading_time': self.reading_time
+        }
+        if self.extra:
+            blog.update(self.extra)
+        if self.key_order is not None:
+            blog = {key: blog[key] for key in self.key_order}
+        return blog
+
+    def size(self):
+        """Approximate bytes held by this record, for result store accounting"""
+        size = 120
+        for value in (self.title, self.url, self.date, self.categories, self.meta_description,
+                      self.featured_image, self._content, self.word_count, self.reading_time):
+            size += len(value) if isinstance(value, (str, bytes)) else 16
+        if self.extra:
+            size += sum(len(str(value)) + 50 for value in self.extra.values())
+        return size
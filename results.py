@@ -0,0 +1,234 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from records import BlogRecord
+
+
+def estimate_size(blogs):
+    """Rough in-memory size of a result set in bytes"""
+    # String payloads dominate; add a flat per-row allowance for the dict itself
+    return sum(blog.size() if isinstance(blog, BlogRecord) else
+               sum(len(str(value)) for value in blog.values()) + 400 for blog in blogs)
+
+
+class ResultStore:
+    """Scrape results keyed by id, bounded in memory with TTL and LRU eviction
+
+    Rows are held as compact BlogRecords and turned back into dicts as they
+    are read. Result sets larger than spill_threshold bytes, and sets evicted
+    to stay under max_bytes, are written to spill_dir as NDJSON when it is
+    configured instead of being dropped.
+
+    With shared_path every result set is also written to that SQLite file,
+    and ids this process does not hold are read from it, so any process
+    serving the app can return a result another one stored.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, ttl=3600, spill_dir=None,
+                 spill_threshold=32 * 1024 * 1024, shared_path=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.spill_dir = spill_dir
+        self.spill_threshold = spill_threshold
+        self.shared_path = shared_path
+        self.entries = OrderedDict()  # result_id -> (records, size, created)
+        self.spilled = {}  # result_id -> (count, created)
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+        if shared_path:
+            conn = self._connect()
+            try:
+                conn.execute('PRAGMA journal_mode=WAL')
+                with conn:
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS results (
+                            id TEXT PRIMARY KEY,
+                            count INTEGER NOT NULL,
+                            created REAL NOT NULL
+                        )
+                    """)
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS result_rows (
+                            result_id TEXT NOT NULL,
+                            position INTEGER NOT NULL,
+                            row TEXT NOT NULL,
+                            PRIMARY KEY (result_id, position)
+                        ) WITHOUT ROWID
+                    """)
+                    conn.execute('CREATE INDEX IF NOT EXISTS results_created ON results (created)')
+            finally:
+                conn.close()
+
+    def put(self, blogs, result_id=None):
+        """Store a result set and return its id"""
+        result_id = result_id or uuid.uuid4().hex
+        records = [BlogRecord.from_dict(blog) for blog in blogs]
+        size = estimate_size(records)
+        now = time.time()
+        if self.shared_path:
+            self._share(result_id, records, now)
+        with self.lock:
+            self._discard(result_id)
+            if self.spill_dir and size > self.spill_threshold:
+                self._spill(result_id, records, now)
+            else:
+                self.entries[result_id] = (records, size, now)
+                self.total_bytes += size
+            self._evict(now)
+        return result_id
+
+    def get(self, result_id):
+        """Return the result set as a list, or None if unknown or expired"""
+        rows = self.iter_rows(result_id)
+        return None if rows is None else list(rows)
+
+    def iter_rows(self, result_id):
+        """Return an iterator over a result set without loading spilled sets whole"""
+        now = time.time()
+        with self.lock:
+            self._expire(now)
+            if result_id in self.entries:
+                self.entries.move_to_end(result_id)
+                return (record.to_dict() for record in self.entries[result_id][0])
+        path = self._spill_path(result_id)
+        if path and os.path.exists(path):
+            if now - os.path.getmtime(path) > self.ttl:
+                self._remove_file(path)
+                return None
+            return self._read_spill(path)
+        if self.shared_path:
+            return self._read_shared(result_id, now)
+        return None
+
+    def count(self, result_id):
+        """Number of rows in a result set, or None if unknown"""
+        with self.lock:
+            if result_id in self.entries:
+                return len(self.entries[result_id][0])
+            if result_id in self.spilled:
+                return self.spilled[result_id][0]
+        if self.shared_path:
+            conn = self._connect()
+            try:
+                row = conn.execute('SELECT count FROM results WHERE id = ? AND created >= ?',
+                                   (result_id, time.time() - self.ttl)).fetchone()
+            finally:
+                conn.close()
+            if row:
+                return row[0]
+        rows = self.iter_rows(result_id)
+        return None if rows is None else sum(1 for _ in rows)
+
+    def delete(self, result_id):
+        with self.lock:
+            self._discard(result_id)
+        if self.shared_path:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute('DELETE FROM results WHERE id = ?', (result_id,))
+                    conn.execute('DELETE FROM result_rows WHERE result_id = ?', (result_id,))
+            finally:
+                conn.close()
+
+    def stats(self):
+        with self.lock:
+            self._expire(time.time())
+            return {
+                'results_in_memory': len(self.entries),
+                'results_on_disk': len(self.spilled),
+                'memory_bytes': self.total_bytes,
+                'max_bytes': self.max_bytes
+            }
+
+    def _spill_path(self, result_id):
+        if not self.spill_dir or not result_id.isalnum():
+            return None
+        return os.path.join(self.spill_dir, f'{result_id}.ndjson')
+
+    def _spill(self, result_id, records, created):
+        path = self._spill_path(result_id)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record.to_dict(), ensure_ascii=False))
+                f.write('\n')
+        os.replace(tmp_path, path)
+        self.spilled[result_id] = (len(records), created)
+
+    def _connect(self):
+        return sqlite3.connect(self.shared_path, timeout=30)
+
+    def _share(self, result_id, records, created):
+        conn = self._connect()
+        try:
+            with conn:
+                # Expired sets are cleared by whichever process stores the next one
+                expired = [row[0] for row in conn.execute('SELECT id FROM results WHERE created < ?',
+                                                          (created - self.ttl,))]
+                for old_id in expired + [result_id]:
+                    conn.execute('DELETE FROM results WHERE id = ?', (old_id,))
+                    conn.execute('DELETE FROM result_rows WHERE result_id = ?', (old_id,))
+                conn.execute('INSERT INTO results (id, count, created) VALUES (?, ?, ?)',
+                             (result_id, len(records), created))
+                conn.executemany('INSERT INTO result_rows (result_id, position, row) VALUES (?, ?, ?)',
+                                 ((result_id, position, json.dumps(record.to_dict(), ensure_ascii=False))
+                                  for position, record in enumerate(records)))
+        finally:
+            conn.close()
+
+    def _read_shared(self, result_id, now):
+        conn = self._connect()
+        if conn.execute('SELECT 1 FROM results WHERE id = ? AND created >= ?',
+                        (result_id, now - self.ttl)).fetchone() is None:
+            conn.close()
+            return None
+        return self._iter_shared(conn, result_id)
+
+    def _iter_shared(self, conn, result_id):
+        try:
+            for (row,) in conn.execute('SELECT row FROM result_rows WHERE result_id = ? ORDER BY position',
+                                       (result_id,)):
+                yield json.loads(row)
+        finally:
+            conn.close()
+
+    def _read_spill(self, path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+    def _remove_file(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _discard(self, result_id):
+        if result_id in self.entries:
+            self.total_bytes -= self.entries.pop(result_id)[1]
+        if self.spilled.pop(result_id, None):
+            self._remove_file(self._spill_path(result_id))
+
+    def _expire(self, now):
+        for result_id, (_, _, created) in list(self.entries.items()):
+            if now - created > self.ttl:
+                self._discard(result_id)
+        for result_id, (_, created) in list(self.spilled.items()):
+            if now - created > self.ttl:
+                self._discard(result_id)
+
+    def _evict(self, now):
+        self._expire(now)
+        while self.total_bytes > self.max_bytes and self.entries:
+            result_id, (records, size, created) = self.entries.popitem(last=False)
+            self.total_bytes -= size
+            if self.spill_dir:
+                self._spill(result_id, records, created)
@@ -0,0 +1,122 @@
+import threading
+import time
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+from fetching import FetchAborted, FetchLimits, decode_body, read_body
+
+# Largest robots.txt read; Google ignores anything past 500 KiB
+MAX_ROBOTS_BYTES = 512 * 1024
+
+
+def parse_crawl_delays(text):
+    """{user-agent token: seconds} from Crawl-delay lines, accepting fractions
+
+    urllib.robotparser only understands whole seconds.
+    """
+    delays = {}
+    agents = []
+    in_rules = False
+    for line in text.splitlines():
+        line = line.split('#', 1)[0].strip()
+        if ':' not in line:
+            continue
+        field, value = (part.strip() for part in line.split(':', 1))
+        field = field.lower()
+        if field == 'user-agent':
+            if in_rules:
+                agents, in_rules = [], False
+            agents.append(value.lower())
+        else:
+            in_rules = True
+            if field == 'crawl-delay':
+                try:
+                    delay = float(value)
+                except ValueError:
+                    continue
+                for agent in agents:
+                    delays.setdefault(agent, delay)
+    return delays
+
+
+class RobotsCache:
+    """robots.txt rules per host, fetched once and kept for ttl seconds
+
+    fetch(url) returns a streamed requests.Response, whose body is read under
+    limits (MAX_ROBOTS_BYTES and a 30s deadline by default). A missing robots.txt allows
+    everything and 401/403 disallows everything, as urllib.robotparser does;
+    a server error, network failure or oversized robots.txt allows everything
+    but is retried after error_ttl seconds.
+    """
+
+    def __init__(self, fetch, user_agent='*', ttl=86400, error_ttl=600, limits=None):
+        self.fetch = fetch
+        self.limits = limits or FetchLimits(MAX_ROBOTS_BYTES, allowed_types=None)
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.entries = {}  # scheme://host -> (parser, text, expires, crawl delays)
+        self.lock = threading.Lock()
+        self.host_locks = {}
+
+    def _entry(self, url):
+        parsed = urlparse(url)
+        root = f"{parsed.scheme}://{parsed.netloc}"
+        with self.lock:
+            entry = self.entries.get(root)
+            if entry and entry[2] > time.time():
+                return entry
+            host_lock = self.host_locks.setdefault(root, threading.Lock())
+        # One fetch per host even when many threads ask at once
+        with host_lock:
+            with self.lock:
+                entry = self.entries.get(root)
+                if entry and entry[2] > time.time():
+                    return entry
+            entry = self._load(root)
+            with self.lock:
+                self.entries[root] = entry
+            return entry
+
+    def _load(self, root):
+        parser = RobotFileParser(f"{root}/robots.txt")
+        try:
+            response = self.fetch(f"{root}/robots.txt")
+            with response:
+                if response.status_code in (401, 403):
+                    parser.disallow_all = True
+                    return parser, '', time.time() + self.ttl, {}
+                if response.status_code >= 500:
+                    parser.allow_all = True
+                    return parser, '', time.time() + self.error_ttl, {}
+                if response.status_code >= 400:
+                    parser.allow_all = True
+                    return parser, '', time.time() + self.ttl, {}
+                text = decode_body(read_body(response, self.limits), response)
+        except (requests.RequestException, FetchAborted) as e:
+            print(f"Could not fetch {root}/robots.txt: {e}")
+            parser.allow_all = True
+            return parser, '', time.time() + self.error_ttl, {}
+        parser.parse(text.splitlines())
+        return parser, text, time.time() + self.ttl, parse_crawl_delays(text)
+
+    def allowed(self, url):
+        return self._entry(url)[0].can_fetch(self.user_agent, url)
+
+    def crawl_delay(self, url):
+        """The host's Crawl-delay (or Request-rate interval) in seconds, or None"""
+        parser, _, _, delays = self._entry(url)
+        # Match the agent the way robotparser does: a group applies if its token is in our name
+        agent = self.user_agent.split('/')[0].lower()
+        delay = next((seconds for token, seconds in delays.items() if token != '*' and token in agent),
+                     delays.get('*'))
+        rate = parser.request_rate(self.user_agent)
+        if rate and rate.requests:
+            delay = max(delay or 0, rate.seconds / rate.requests)
+        return float(delay) if delay else None
+
+    def text(self, url):
+        """The raw robots.txt of url's host, '' if there is none"""
+        return self._entry(url)[1]
@@ -0,0 +1,211 @@
+"""Readable text of a post body, built in one walk of the parsed tree
+
+Subtrees in SKIP_TAGS are passed over rather than decomposed, so the tree is
+left as it was. Block elements become paragraphs separated by a blank line,
+<br> a line break, and runs of whitespace inside a paragraph a single space.
+With markdown=True headings, lists, quotes, code, emphasis, links and images
+are kept as Markdown.
+"""
+import math
+import re
+
+from bs4.element import PreformattedString, Tag
+from lxml import etree
+
+TEXT = 'text'
+MARKDOWN = 'markdown'
+CONTENT_FORMATS = (TEXT, MARKDOWN)
+
+SKIP_TAGS = frozenset(['script', 'style', 'noscript', 'template', 'nav', 'aside'])
+BLOCK_TAGS = frozenset([
+    'address', 'article', 'blockquote', 'dd', 'details', 'div', 'dl', 'dt', 'figcaption', 'figure',
+    'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'ol', 'p', 'pre',
+    'section', 'summary', 'table', 'tr', 'ul'
+])
+HEADING_TAGS = frozenset(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+CELL_TAGS = frozenset(['td', 'th'])
+EMPHASIS_MARKS = {'strong': '**', 'b': '**', 'em': '*', 'i': '*', 'code': '`'}
+
+# Average silent reading speed of adults for non-fiction
+WORDS_PER_MINUTE = 238
+
+SPACE_RE = re.compile(r'\s+')
+WORD_RE = re.compile(r"\w+(?:['’-]\w+)*")
+# Link and image targets and list numbers, which are not words a reader reads
+MARKDOWN_TARGET_RE = re.compile(r'\]\([^)\s]*\)')
+ITEM_NUMBER_RE = re.compile(r'^[> ]*\d+\. ', re.M)
+
+
+class TextBuilder:
+    """Collects paragraphs from start/end/text calls made in document order"""
+
+    def __init__(self, markdown=False):
+        self.markdown = markdown
+        self.blocks = []
+        self.parts = []  # pieces of the paragraph being built
+        self.prefix = ''  # Markdown heading or list marker of that paragraph
+        self.lists = []  # next item number of each open <ol>, None for <ul>
+        self.links = []
+        self.quotes = 0
+        self.pre = 0
+        self.cells = 0
+
+    def text(self, value):
+        self.parts.append(value if self.pre else SPACE_RE.sub(' ', value))
+
+    def start(self, tag, element):
+        if tag in BLOCK_TAGS:
+            self.flush()
+            if tag == 'pre':
+                self.pre += 1
+            elif tag == 'ul' or tag == 'ol':
+                self.lists.append(1 if tag == 'ol' else None)
+            elif tag == 'blockquote':
+                self.quotes += 1
+            elif tag == 'tr':
+                self.cells = 0
+            elif self.markdown:
+                if tag in HEADING_TAGS:
+                    self.prefix = '#' * int(tag[1]) + ' '
+                elif tag == 'li':
+                    self.prefix = self._item_marker()
+                elif tag == 'hr':
+                    self.blocks.append('---')
+        elif tag == 'br':
+            self.parts.append('\n')
+        elif tag in CELL_TAGS:
+            if self.cells:
+                self.parts.append(' | ')
+            self.cells += 1
+        elif self.markdown:
+            if tag in EMPHASIS_MARKS:
+                if not self.pre:
+                    self.parts.append(EMPHASIS_MARKS[tag])
+            elif tag == 'a':
+                href = element.get('href')
+                self.links.append(href)
+                if href:
+                    self.parts.append('[')
+            elif tag == 'img' and element.get('src'):
+                alt = SPACE_RE.sub(' ', element.get('alt') or '').strip()
+                self.parts.append(f" ![{alt}]({element.get('src')}) ")
+
+    def end(self, tag, element):
+        if tag in BLOCK_TAGS:
+            self.flush()
+            if tag == 'pre':
+                self.pre -= 1
+            elif tag == 'ul' or tag == 'ol':
+                self.lists.pop()
+            elif tag == 'blockquote':
+                self.quotes -= 1
+            self.prefix = ''
+        elif self.markdown:
+            if tag in EMPHASIS_MARKS:
+                if not self.pre:
+                    self._close(EMPHASIS_MARKS[tag], EMPHASIS_MARKS[tag])
+            elif tag == 'a':
+                href = self.links.pop()
+                if href:
+                    self._close('[', f']({href})')
+
+    def _item_marker(self):
+        if not self.lists or self.lists[-1] is None:
+            marker = '- '
+        else:
+            marker = f'{self.lists[-1]}. '
+            self.lists[-1] += 1
+        return '  ' * max(len(self.lists) - 1, 0) + marker
+
+    def _close(self, opener, closer):
+        parts = self.parts
+        if parts and parts[-1] == opener:
+            # Nothing inside, e.g. <strong></strong>
+            parts.pop()
+        elif parts and parts[-1].endswith(' '):
+            # Markdown needs the closing mark right after the last word
+            parts[-1] = parts[-1].rstrip(' ')
+            parts.append(closer + ' ')
+        else:
+            parts.append(closer)
+
+    def flush(self):
+        """End the paragraph being built"""
+        text = ''.join(self.parts)
+        self.parts = []
+        if self.pre:
+            text = text.strip('\n')
+        else:
+            text = '\n'.join(line for line in (' '.join(line.split()) for line in text.split('\n')) if line)
+        if not text.strip():
+            # Keep a list marker for the first paragraph inside the item
+            return
+        if self.markdown:
+            if self.pre:
+                text = f'```\n{text}\n```'
+            text = self.prefix + text
+            if self.quotes:
+                text = '\n'.join('> ' * self.quotes + line for line in text.split('\n'))
+        self.prefix = ''
+        self.blocks.append(text)
+
+    def result(self):
+        self.flush()
+        return '\n\n'.join(self.blocks)
+
+
+def _walk_lxml(root, builder):
+    walker = etree.iterwalk(root, events=('start', 'end', 'comment', 'pi'))
+    for event, element in walker:
+        if event == 'start':
+            if element.tag in SKIP_TAGS:
+                walker.skip_subtree()
+                continue
+            builder.start(element.tag, element)
+            if element.text:
+                builder.text(element.text)
+            continue
+        if event == 'end' and element.tag not in SKIP_TAGS:
+            builder.end(element.tag, element)
+        # Text after a skipped element, comment or processing instruction still belongs to its parent
+        if element.tail and element is not root:
+            builder.text(element.tail)
+
+
+def _walk_soup(root, builder):
+    builder.start(root.name, root)
+    stack = [(root, iter(root.children))]
+    while stack:
+        child = next(stack[-1][1], None)
+        if child is None:
+            tag = stack.pop()[0]
+            builder.end(tag.name, tag)
+        elif isinstance(child, Tag):
+            if child.name not in SKIP_TAGS:
+                builder.start(child.name, child)
+                stack.append((child, iter(child.children)))
+        elif not isinstance(child, PreformattedString):
+            # Comments, CDATA, doctypes and processing instructions are PreformattedStrings
+            builder.text(child)
+
+
+def extract_text(element, markdown=False):
+    """Readable text of an lxml element or BeautifulSoup tag, or Markdown with markdown=True"""
+    builder = TextBuilder(markdown)
+    if isinstance(element, etree._Element):
+        _walk_lxml(element, builder)
+    else:
+        _walk_soup(element, builder)
+    return builder.result()
+
+
+def count_words(text, markdown=False):
+    if markdown:
+        text = ITEM_NUMBER_RE.sub('', MARKDOWN_TARGET_RE.sub(']', text))
+    return len(WORD_RE.findall(text))
+
+
+def text_stats(text, markdown=False):
+    """{'word_count', 'reading_time'} of extracted content, reading time in whole minutes"""
+    words = count_words(text, markdown)
+    return {'word_count': words, 'reading_time': math.ceil(words / WORDS_PER_MINUTE)}
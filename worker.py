@@ -0,0 +1,220 @@
+"""Scrape worker for distributed crawls, leasing listing pages and posts from a shared work queue
+
+Crawls are queued by the coordinator (app.py with WORK_QUEUE_PATH set, via
+POST /crawls). Any number of workers, on one machine or several sharing the
+queue file, lease its tasks, scrape them and store the results back. A
+worker that dies loses nothing: its leases run out and other workers pick
+its URLs up. Per-host request pacing is kept in the same file, so rate
+limits, Crawl-delay and 429 backoff hold across all workers together.
+
+Usage: python worker.py [OPTIONS]
+       python worker.py --queue /shared/scrape_queue.sqlite --threads 8
+"""
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import click
+
+from crawl import PAGE
+from engine import build_scraper, robots_cache
+from ratelimit import SharedHostLimiter
+from workqueue import WorkQueue
+
+# Crawls whose scrapers are kept at once; the least recently used one is dropped past this
+MAX_SCRAPERS = 4
+
+
+class LinkCollector:
+    """Frontier stand-in that keeps the links expand_frontier finds on one listing page
+
+    The queue applies the crawl budgets and deduplication when they are added.
+    """
+
+    def __init__(self, max_posts=None):
+        self.max_posts = max_posts
+        self.posts = []
+        self.pages = []
+
+    def for_page(self, page_url):
+        return self
+
+    def add_post(self, url):
+        self.posts.append(url)
+        return True
+
+    def add_page(self, url):
+        self.pages.append(url)
+        return True
+
+    def post_budget_spent(self):
+        return False
+
+
+class Worker:
+    """Leases tasks from a WorkQueue on several threads, with one scraper per crawl
+
+    Leases are renewed every visibility_timeout / 3 seconds while a task is
+    being worked on, so a slow page is not handed to a second worker.
+    """
+
+    def __init__(self, queue, limiter, threads=4, visibility_timeout=120.0, poll_interval=1.0,
+                 idle_timeout=0, worker_id=None):
+        self.queue = queue
+        self.limiter = limiter
+        self.threads = max(1, int(threads))
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        # Stop after leasing nothing for idle_timeout seconds; 0 runs until stopped
+        self.idle_timeout = idle_timeout
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.scrapers = OrderedDict()  # crawl id -> (scraper, crawl params), least recently used first
+        self.held = set()
+        self.counts = dict.fromkeys(['pages', 'posts', 'failed', 'lost'], 0)
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+
+    def scraper_for(self, crawl_id):
+        with self.lock:
+            if crawl_id in self.scrapers:
+                self.scrapers.move_to_end(crawl_id)
+                return self.scrapers[crawl_id]
+        crawl = self.queue.crawl(crawl_id)
+        # The queue schedules retries and the coordinator drops duplicates across all workers'
+        # results, so each scraper fetches one URL per call and keeps no state of its own.
+        # With max_attempts=2 a failure is pending retry exactly when it was transient
+        scraper = build_scraper(dict(crawl['params'], concurrency=1, dedupe='off', incremental=False,
+                                     max_attempts=2))
+        scraper.rate_limiter = self.limiter
+        with self.lock:
+            entry = self.scrapers.setdefault(crawl_id, (scraper, crawl['params']))
+            # Tasks already running keep their scraper; only the cache lets go of it
+            while len(self.scrapers) > MAX_SCRAPERS:
+                self.scrapers.popitem(last=False)
+            return entry
+
+    def run_task(self, task):
+        scraper, params = self.scraper_for(task['crawl_id'])
+        if task['kind'] == PAGE:
+            page_url, html_content = scraper.fetch_listing(task['url'])
+            if not html_content:
+                return self.failed(task, scraper.retries.forget(page_url))
+            max_posts = int(params['max_posts']) if params.get('max_posts') else None
+            links = LinkCollector(max_posts)
+            scraper.expand_frontier(links, page_url, html_content,
+                                    discover=scraper.discovery == 'auto' and task['url'] == task['root'])
+            done = self.queue.complete_page(task, self.worker_id, links.posts, links.pages,
+                                            max(1, int(params.get('max_pages', 1))), max_posts)
+            self.count('pages' if done else 'lost')
+            return
+
+        blog_data = scraper.scrape_blog_content(task['url'])
+        failure = scraper.retries.forget(task['url']) if blog_data is None else None
+        if failure:
+            return self.failed(task, failure)
+        if not self.queue.complete_post(task, self.worker_id, blog_data):
+            return self.count('lost')
+        if blog_data and scraper.archive:
+            scraper.archive.add(blog_data, task['root'])
+        self.count('posts')
+
+    def failed(self, task, failure):
+        error, transient = failure or ('empty response', False)
+        self.queue.fail(task, self.worker_id, error, transient)
+        self.count('failed')
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def work(self):
+        idle_since = time.monotonic()
+        while not self.stopping.is_set():
+            tasks = self.queue.lease(self.worker_id, 1, self.visibility_timeout)
+            if not tasks:
+                if self.idle_timeout and time.monotonic() - idle_since >= self.idle_timeout:
+                    return
+                self.stopping.wait(self.poll_interval)
+                continue
+            for task in tasks:
+                with self.lock:
+                    self.held.add(task['id'])
+                try:
+                    self.run_task(task)
+                except Exception as e:
+                    print(f"Task {task['url']} failed: {e}")
+                    self.queue.fail(task, self.worker_id, str(e))
+                    self.count('failed')
+                finally:
+                    with self.lock:
+                        self.held.discard(task['id'])
+            idle_since = time.monotonic()
+
+    def heartbeat(self):
+        while not self.stopping.wait(self.visibility_timeout / 3):
+            with self.lock:
+                held = list(self.held)
+            self.queue.extend(self.worker_id, held, self.visibility_timeout)
+
+    def run(self):
+        """Work until stop() is called or, with idle_timeout, the queue stays empty"""
+        threading.Thread(target=self.heartbeat, name='lease-heartbeat', daemon=True).start()
+        threads = [threading.Thread(target=self.work, name=f'scrape-worker-{i}') for i in range(self.threads)]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        finally:
+            self.stop()
+            for thread in threads:
+                thread.join()
+            # Tasks cut short by shutdown go back to the queue without using up an attempt
+            self.queue.release(self.worker_id)
+            for scraper, _ in self.scrapers.values():
+                if scraper.archive:
+                    scraper.archive.flush()
+
+    def stop(self):
+        """Finish the tasks in progress and stop leasing new ones"""
+        self.stopping.set()
+
+
+@click.command(help=__doc__.split('\nUsage:')[0])
+@click.option('-q', '--queue', 'queue_path', default=lambda: os.environ.get('WORK_QUEUE_PATH', 'scrape_queue.sqlite'),
+              show_default='WORK_QUEUE_PATH or scrape_queue.sqlite', help='Work queue file shared with the coordinator.')
+@click.option('-t', '--threads', default=4, show_default=True, help='Tasks worked on at once.')
+@click.option('--visibility-timeout', default=120.0, show_default=True,
+              help='Seconds a lease lasts without renewal before the task goes to another worker.')
+@click.option('--max-attempts', default=3, show_default=True, help='Leases per URL before giving up.')
+@click.option('--requests-per-second', default=2.0, show_default=True, help='Starting request rate per host.')
+@click.option('--max-requests-per-second', default=10.0, show_default=True,
+              help='Fastest request rate per host, across all workers.')
+@click.option('--max-in-flight-per-host', default=2, show_default=True, help='Concurrent requests per host.')
+@click.option('--respect-robots/--ignore-robots', default=True, show_default=True)
+@click.option('--poll-interval', default=1.0, show_default=True, help='Seconds between polls of an empty queue.')
+@click.option('--idle-timeout', default=0.0, help='Exit after the queue has been empty this many seconds.')
+def main(queue_path, threads, visibility_timeout, max_attempts, requests_per_second, max_requests_per_second,
+         max_in_flight_per_host, respect_robots, poll_interval, idle_timeout):
+    queue = WorkQueue(queue_path, max_attempts=max_attempts)
+    limiter = SharedHostLimiter(queue_path, requests_per_second, max_in_flight_per_host, max_requests_per_second,
+                                robots_cache if respect_robots else None)
+    worker = Worker(queue, limiter, threads, visibility_timeout, poll_interval, idle_timeout)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    click.echo(f'Worker {worker.worker_id} polling {queue_path}', err=True)
+    started = time.monotonic()
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        pass
+    counts = worker.counts
+    click.echo(f"Stopped after {time.monotonic() - started:.1f}s: {counts['pages']} pages, {counts['posts']} posts, "
+               f"{counts['failed']} failed fetches, {counts['lost']} leases lost", err=True)
+
+
+if __name__ == '__main__':
+    main()
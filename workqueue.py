@@ -0,0 +1,243 @@
+import json
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+
+from crawl import PAGE, POST
+
+READY = 'ready'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class WorkQueue:
+    """Shared frontier of listing pages and posts that worker processes lease tasks from
+
+    Each crawl's listing URLs are queued as page tasks. A worker leases a
+    task for visibility_timeout seconds and either completes it (a page adds
+    the posts and further pages it links, a post stores its row) or fails it.
+    A lease that runs out before that, because the worker crashed or hung,
+    makes the task available to the next worker that asks, so no URL is lost
+    with its worker. A URL is queued once per crawl; max_pages and max_posts
+    apply to each listing URL as in a batch scrape.
+
+    Everything lives in one SQLite file in WAL mode, so workers on one machine
+    or on a shared volume can all open it; every claim runs in a write
+    transaction, so a task is never leased to two workers at once.
+    """
+
+    def __init__(self, path, max_attempts=3, retry_delay=1.0, max_delay=60.0):
+        self.path = path
+        self.max_attempts = max(1, int(max_attempts))
+        self.retry_delay = retry_delay
+        self.max_delay = max_delay
+        with self._transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS crawls (
+                    id TEXT PRIMARY KEY,
+                    urls TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY,
+                    crawl_id TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    root TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    available_at REAL NOT NULL DEFAULT 0,
+                    lease_owner TEXT,
+                    lease_expires REAL,
+                    error TEXT,
+                    row TEXT,
+                    UNIQUE (crawl_id, url)
+                )
+            """)
+            conn.execute('CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, available_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS tasks_crawl ON tasks (crawl_id, root, kind)')
+            # Every listing URL that linked a post, for the 'sources' of batch results
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS post_sources (
+                    crawl_id TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    root TEXT NOT NULL,
+                    PRIMARY KEY (crawl_id, url, root)
+                )
+            """)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so concurrent claims queue instead of deadlocking
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+
+    def create_crawl(self, urls, params=None):
+        """Queue a crawl of the listing URLs and return its id"""
+        crawl_id = uuid.uuid4().hex
+        urls = list(dict.fromkeys(urls))
+        with self._transaction() as conn:
+            conn.execute('INSERT INTO crawls (id, urls, params, created_at) VALUES (?, ?, ?, ?)',
+                         (crawl_id, json.dumps(urls), json.dumps(params or {}), time.time()))
+            conn.executemany('INSERT OR IGNORE INTO tasks (crawl_id, url, kind, root, state) VALUES (?, ?, ?, ?, ?)',
+                             [(crawl_id, url, PAGE, url, READY) for url in urls])
+        return crawl_id
+
+    def crawl(self, crawl_id):
+        """{'id', 'urls', 'params', 'created_at'} of a crawl, or None"""
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT * FROM crawls WHERE id = ?', (crawl_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return {**dict(row), 'urls': json.loads(row['urls']), 'params': json.loads(row['params'])}
+
+    def lease(self, worker_id, limit=1, visibility_timeout=60.0):
+        """Claim up to limit tasks for visibility_timeout seconds, listing pages first
+
+        Returns [{'id', 'crawl_id', 'url', 'kind', 'root', 'attempts'}]. Tasks
+        whose lease ran out are claimed again; those that already used
+        max_attempts leases are failed instead.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("UPDATE tasks SET state = ?, lease_owner = NULL, error = 'lease expired' "
+                         'WHERE state = ? AND lease_expires <= ? AND attempts >= ?',
+                         (FAILED, LEASED, now, self.max_attempts))
+            rows = conn.execute(
+                'UPDATE tasks SET state = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1 '
+                'WHERE id IN (SELECT id FROM tasks WHERE (state = ? AND available_at <= ?) '
+                'OR (state = ? AND lease_expires <= ?) ORDER BY kind = ? DESC, id LIMIT ?) '
+                'RETURNING id, crawl_id, url, kind, root, attempts',
+                (LEASED, worker_id, now + visibility_timeout, READY, now, LEASED, now, PAGE, limit)
+            ).fetchall()
+        return sorted((dict(row) for row in rows), key=lambda task: (task['kind'] != PAGE, task['id']))
+
+    def extend(self, worker_id, task_ids, visibility_timeout=60.0):
+        """Renew the leases worker_id still holds; returns how many it still had"""
+        if not task_ids:
+            return 0
+        with self._transaction() as conn:
+            return conn.execute(
+                f"UPDATE tasks SET lease_expires = ? WHERE lease_owner = ? AND state = ? "
+                f"AND id IN ({', '.join('?' * len(task_ids))})",
+                (time.time() + visibility_timeout, worker_id, LEASED, *task_ids)
+            ).rowcount
+
+    def _finish(self, conn, task, worker_id, state, **fields):
+        assignments = ''.join(f', {key} = ?' for key in fields)
+        return conn.execute(
+            f'UPDATE tasks SET state = ?, lease_owner = NULL{assignments} '
+            'WHERE id = ? AND lease_owner = ? AND state = ?',
+            (state, *fields.values(), task['id'], worker_id, LEASED)
+        ).rowcount == 1
+
+    def complete_page(self, task, worker_id, post_links, page_links, max_pages=1, max_posts=None):
+        """Finish a listing page and queue the links found on it under its listing URL's budgets
+
+        Returns False, queueing nothing, if the lease was lost to another worker.
+        """
+        crawl_id, root = task['crawl_id'], task['root']
+        with self._transaction() as conn:
+            if not self._finish(conn, task, worker_id, DONE, error=None):
+                return False
+            counts = dict(conn.execute('SELECT kind, COUNT(*) FROM tasks WHERE crawl_id = ? AND root = ? '
+                                       'GROUP BY kind', (crawl_id, root)).fetchall())
+            posts = counts.get(POST, 0)
+            for url in post_links:
+                if max_posts is not None and posts >= max_posts:
+                    break
+                conn.execute('INSERT OR IGNORE INTO post_sources (crawl_id, url, root) VALUES (?, ?, ?)',
+                             (crawl_id, url, root))
+                posts += conn.execute('INSERT OR IGNORE INTO tasks (crawl_id, url, kind, root, state) '
+                                      'VALUES (?, ?, ?, ?, ?)', (crawl_id, url, POST, root, READY)).rowcount
+            if max_posts is None or posts < max_posts:
+                pages = counts.get(PAGE, 0)
+                for url in page_links:
+                    if pages >= max_pages:
+                        break
+                    pages += conn.execute('INSERT OR IGNORE INTO tasks (crawl_id, url, kind, root, state) '
+                                          'VALUES (?, ?, ?, ?, ?)', (crawl_id, url, PAGE, root, READY)).rowcount
+        return True
+
+    def complete_post(self, task, worker_id, row):
+        """Store a post's row (None for posts that gave none); False if the lease was lost"""
+        with self._transaction() as conn:
+            return self._finish(conn, task, worker_id, DONE, error=None,
+                                row=json.dumps(row) if row is not None else None)
+
+    def fail(self, task, worker_id, error, transient=True):
+        """Record a failed fetch; transient failures are tried again after a backoff until max_attempts"""
+        with self._transaction() as conn:
+            if transient and task['attempts'] < self.max_attempts:
+                delay = min(self.max_delay, self.retry_delay * 2 ** (task['attempts'] - 1))
+                return self._finish(conn, task, worker_id, READY, error=error, available_at=time.time() + delay)
+            return self._finish(conn, task, worker_id, FAILED, error=error)
+
+    def release(self, worker_id):
+        """Hand back every task worker_id holds without counting the attempt, e.g. on shutdown"""
+        with self._transaction() as conn:
+            return conn.execute('UPDATE tasks SET state = ?, lease_owner = NULL, attempts = attempts - 1 '
+                                'WHERE lease_owner = ? AND state = ?', (READY, worker_id, LEASED)).rowcount
+
+    def progress(self, crawl_id):
+        """Task counts of a crawl by kind and state, and whether it has finished"""
+        conn = self._connect()
+        try:
+            rows = conn.execute('SELECT kind, state, COUNT(*) FROM tasks WHERE crawl_id = ? GROUP BY kind, state',
+                                (crawl_id,)).fetchall()
+        finally:
+            conn.close()
+        counts = {kind: dict.fromkeys((READY, LEASED, DONE, FAILED), 0) for kind in (PAGE, POST)}
+        for kind, state, count in rows:
+            counts[kind][state] = count
+        finished = not any(counts[kind][READY] or counts[kind][LEASED] for kind in counts)
+        return {'pages': counts[PAGE], 'posts': counts[POST], 'finished': finished}
+
+    def iter_rows(self, crawl_id):
+        """Rows of the crawl's finished posts in the order they were found, each with its 'sources'"""
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "SELECT t.row, (SELECT json_group_array(root) FROM post_sources s "
+                "WHERE s.crawl_id = t.crawl_id AND s.url = t.url) AS sources "
+                'FROM tasks t WHERE t.crawl_id = ? AND t.kind = ? AND t.state = ? AND t.row IS NOT NULL '
+                'ORDER BY t.id', (crawl_id, POST, DONE))
+            for row, sources in cursor:
+                blog_data = json.loads(row)
+                blog_data['sources'] = json.loads(sources)
+                yield blog_data
+        finally:
+            conn.close()
+
+    def failures(self, crawl_id):
+        """[{'url', 'attempts', 'error'}] of tasks that gave up"""
+        conn = self._connect()
+        try:
+            rows = conn.execute('SELECT url, attempts, error FROM tasks WHERE crawl_id = ? AND state = ? ORDER BY id',
+                                (crawl_id, FAILED)).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]